@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+"""Measure the cost of instantiating a generated class, per widget.
+
+Two interfaces are measured: a flat ``GtkBox`` holding a configurable number
+of labels, and a composite widget of nested boxes with the same number of
+descendants. Each is instantiated with properties set one at a time after
+construction, and with properties passed to the Gtk constructor
+(``construct_properties=True``).
+
+Run it against different revisions of the library to compare them.
+"""
+from gtkclassbuilder import from_string
+import argparse
+import timeit
+
+LABEL = """
+    <child>
+      <object class="GtkLabel" id="label%(n)d">
+        <property name="visible">True</property>
+        <property name="can_focus">False</property>
+        <property name="label">Label number %(n)d</property>
+        <property name="xalign">0</property>
+        <property name="justify">center</property>
+        <property name="selectable">True</property>
+      </object>
+      <packing>
+        <property name="expand">False</property>
+        <property name="fill">True</property>
+        <property name="position">%(n)d</property>
+      </packing>
+    </child>"""
+
+INTERFACE = """<interface>
+  <object class="GtkBox" id="Root">
+    <property name="visible">True</property>
+    <property name="orientation">vertical</property>
+    %s
+  </object>
+</interface>"""
+
+
+BOX = """
+    <child>
+      <object class="GtkBox" id="box%(n)d">
+        <property name="visible">True</property>
+        <property name="orientation">horizontal</property>
+        %(children)s
+      </object>
+    </child>"""
+
+
+def make_interface(widgets):
+    """Return a glade document with `widgets` labels inside a box."""
+    return INTERFACE % ''.join(LABEL % {'n': n} for n in range(widgets))
+
+
+def make_nested_interface(widgets, fanout=4):
+    """Return a glade document with `widgets` descendants of nested boxes.
+
+    Each box holds up to `fanout` children; the leaves of the tree are
+    labels.
+    """
+    counter = iter(range(widgets))
+
+    def subtree(remaining):
+        children = []
+        while remaining > 0 and len(children) < fanout:
+            n = next(counter)
+            share = (remaining - 1) // (fanout - len(children))
+            if share > 0:
+                children.append(BOX % {'n': n, 'children': subtree(share)})
+            else:
+                children.append(LABEL % {'n': n})
+                share = 0
+            remaining -= share + 1
+        return ''.join(children)
+
+    return INTERFACE % subtree(widgets)
+
+
+def measure(builder, widgets, repeat):
+    """Return the best time to instantiate ``Root``, in seconds per widget."""
+    cls = builder['Root']
+    times = timeit.repeat(cls, number=1, repeat=repeat)
+    return min(times) / (widgets + 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--widgets', type=int, default=200)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    interfaces = [
+        ('flat', make_interface(args.widgets)),
+        ('nested', make_nested_interface(args.widgets)),
+    ]
+    for name, interface in interfaces:
+        for construct_properties in (False, True):
+            builder = from_string(interface,
+                                  construct_properties=construct_properties)
+            per_widget = measure(builder, args.widgets, args.repeat)
+            print('%-6s construct_properties=%-5s %8.2f us/widget' %
+                  (name, construct_properties, per_widget * 1e6))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,307 @@
+#!/usr/bin/env python
+"""Measure each phase of turning glade files into widgets.
+
+For each document, four phases are measured separately:
+
+    parse        parsing, validating and converting the xml, and declaring
+                 the classes, in the single pass used by ``from_string``
+                 and ``from_filename`` (``_stream.load``); the registry and
+                 the on-disk cache are not used
+    generate     generating every class (``Builder._define``)
+    instantiate  instantiating each top-level class (``BuiltObject.__init__``)
+    connect      connecting the signals of those instances
+                 (``connect_signals``)
+
+The documents are the examples shipped with the library (``hello``,
+``ChatWin`` and ``EmailView``), and synthetic trees of boxes, with
+``--width`` children per box and ``--depth`` levels of boxes, whose leaves
+are labels and buttons with signal handlers. Several widths and depths may be
+given; every combination is measured.
+
+The time reported for a phase is the best of ``--repeat`` runs. A separate,
+untimed run of each phase is traced with `tracemalloc`, to report the peak
+memory allocated during it and the number of blocks it left allocated.
+
+``--save FILE`` writes the results to a json file, and ``--baseline FILE``
+compares them against a file saved earlier: any phase which has become
+slower, or allocates more, by more than ``--tolerance`` is reported, and the
+exit status is 1.
+
+Gtk needs a display, even though no window is shown; to run the suite
+headless, use Xvfb::
+
+    xvfb-run -a python benchmarks/suite.py
+
+or the broadway backend::
+
+    broadwayd :5 &
+    GDK_BACKEND=broadway BROADWAY_DISPLAY=:5 python benchmarks/suite.py
+"""
+from gtkclassbuilder import _from_stream
+
+import argparse
+import io
+import json
+import os
+import sys
+import time
+import tracemalloc
+import xml.etree.ElementTree as ET
+
+EXAMPLES = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                        '..', 'examples')
+
+EXAMPLE_FILES = [
+    ('hello', os.path.join('hello', 'hello.glade')),
+    ('ChatWin', os.path.join('ChatWin', 'ChatWin.glade')),
+    ('EmailView', os.path.join('EmailView', 'draft-email-view.glade')),
+]
+
+PHASES = ('parse', 'generate', 'instantiate', 'connect')
+
+INTERFACE = """<interface>
+  <object class="GtkWindow" id="Root">
+    <property name="can_focus">False</property>
+    <property name="title">Synthetic</property>
+    <child>
+%s
+    </child>
+  </object>
+</interface>"""
+
+BOX = """<object class="GtkBox" id="box%(n)d">
+  <property name="visible">True</property>
+  <property name="orientation">%(orientation)s</property>
+  <property name="spacing">4</property>
+  %(children)s
+</object>"""
+
+CHILD = """<child>
+%(object)s
+  <packing>
+    <property name="expand">False</property>
+    <property name="fill">True</property>
+    <property name="position">%(position)d</property>
+  </packing>
+</child>"""
+
+LABEL = """<object class="GtkLabel" id="label%(n)d">
+  <property name="visible">True</property>
+  <property name="label">Label number %(n)d</property>
+  <property name="xalign">0</property>
+  <property name="selectable">True</property>
+</object>"""
+
+BUTTON = """<object class="GtkButton" id="button%(n)d">
+  <property name="label">Button number %(n)d</property>
+  <property name="visible">True</property>
+  <property name="receives_default">True</property>
+  <signal name="clicked" handler="on_clicked" swapped="no"/>
+</object>"""
+
+
+def make_interface(width, depth):
+    """Return a glade document with `depth` levels of `width` wide boxes."""
+    counter = iter(range(sys.maxsize))
+
+    def subtree(level):
+        n = next(counter)
+        if level == depth:
+            return (BUTTON if n % 2 else LABEL) % {'n': n}
+        children = ''.join(CHILD % {'object': subtree(level + 1),
+                                    'position': position}
+                           for position in range(width))
+        return BOX % {'n': n,
+                      'orientation': 'vertical' if level % 2 else
+                      'horizontal',
+                      'children': children}
+
+    return INTERFACE % subtree(0)
+
+
+def documents(widths, depths):
+    """Return a list of ``(name, document)`` pairs to measure."""
+    result = []
+    for name, filename in EXAMPLE_FILES:
+        with open(os.path.join(EXAMPLES, filename)) as f:
+            result.append((name, f.read()))
+    for width in widths:
+        for depth in depths:
+            result.append(('synthetic-w%d-d%d' % (width, depth),
+                           make_interface(width, depth)))
+    return result
+
+
+class Handlers(object):
+    """Signal handlers for every signal, doing nothing."""
+
+    def __getattr__(self, name):
+        return _ignore
+
+
+def _ignore(*args):
+    pass
+
+
+def _parse(document):
+    return _from_stream(io.BytesIO(document.encode('utf-8')))
+
+
+def _generate(builder):
+    for ident in builder:
+        builder[ident]
+    return builder
+
+
+def _top_level(document):
+    return [elt.attrib['id']
+            for elt in ET.fromstring(document).findall('./object')]
+
+
+def _destroy(objects):
+    for obj in objects:
+        if hasattr(obj, 'destroy'):
+            obj.destroy()
+
+
+def phases(document):
+    """Return the phases of building `document`.
+
+    The result is a list of ``(name, setup, run, cleanup)`` tuples. `run`
+    is passed the result of `setup`, and `cleanup` is passed the result of
+    `run`; only `run` is measured.
+    """
+    top_level = _top_level(document)
+    # Instances of a warm builder, whose plans have already been compiled,
+    # show the steady state cost of instantiation.
+    warm = _generate(_parse(document))
+    _destroy([warm[ident]() for ident in top_level])
+
+    def instantiate(builder):
+        return [builder[ident]() for ident in top_level]
+
+    def connect(objects):
+        handlers = Handlers()
+        for obj in objects:
+            obj.connect_signals(handlers)
+        return objects
+
+    return [
+        ('parse', lambda: document, _parse, _ignore),
+        ('generate', lambda: _parse(document), _generate, _ignore),
+        ('instantiate', lambda: warm, instantiate, _destroy),
+        ('connect', lambda: instantiate(warm), connect, _destroy),
+    ]
+
+
+def measure(setup, run, cleanup, repeat):
+    """Return the timing and allocations of a phase, as a dict.
+
+    The keys are ``seconds`` (the best of `repeat` runs), ``peak_bytes``
+    and ``blocks``.
+    """
+    best = None
+    for _ in range(repeat):
+        arg = setup()
+        start = time.perf_counter()
+        result = run(arg)
+        elapsed = time.perf_counter() - start
+        cleanup(result)
+        if best is None or elapsed < best:
+            best = elapsed
+
+    arg = setup()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        tracemalloc.reset_peak()
+        base, _ = tracemalloc.get_traced_memory()
+        result = run(arg)
+        _, peak = tracemalloc.get_traced_memory()
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+    blocks = sum(stat.count_diff
+                 for stat in after.compare_to(before, 'filename'))
+    cleanup(result)
+    return {'seconds': best, 'peak_bytes': peak - base, 'blocks': blocks}
+
+
+def run_suite(widths, depths, repeat, report=None):
+    """Measure every phase of every document.
+
+    Returns a dict mapping document names to dicts mapping phase names to
+    the result of `measure`. `report` is called with the document name,
+    phase name and result as each measurement is made.
+    """
+    results = {}
+    for name, document in documents(widths, depths):
+        results[name] = {}
+        for phase, setup, run, cleanup in phases(document):
+            result = measure(setup, run, cleanup, repeat)
+            results[name][phase] = result
+            if report is not None:
+                report(name, phase, result)
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Return a list of descriptions of regressions against `baseline`.
+
+    A phase has regressed if its time or peak allocations have grown by more
+    than the fraction `tolerance`.
+    """
+    regressions = []
+    for name, phases in sorted(results.items()):
+        for phase, result in sorted(phases.items()):
+            old = baseline.get(name, {}).get(phase)
+            if old is None:
+                continue
+            for key in ('seconds', 'peak_bytes'):
+                if old[key] > 0 and \
+                        result[key] > old[key] * (1 + tolerance):
+                    regressions.append('%s %s: %s %.4g -> %.4g (%+.0f%%)' % (
+                        name, phase, key, old[key], result[key],
+                        (result[key] / old[key] - 1) * 100))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--width', type=int, nargs='+', default=[4],
+                        help='children per box in the synthetic documents')
+    parser.add_argument('--depth', type=int, nargs='+', default=[2, 4],
+                        help='levels of boxes in the synthetic documents')
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--save', metavar='FILE',
+                        help='write the results to FILE')
+    parser.add_argument('--baseline', metavar='FILE',
+                        help='compare the results with those saved in FILE')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='fraction by which a phase may grow before it '
+                        'counts as a regression (default: 0.25)')
+    args = parser.parse_args(argv)
+
+    def report(name, phase, result):
+        print('%-22s %-12s %10.2f us %10.1f KiB peak %8d blocks' % (
+            name, phase, result['seconds'] * 1e6,
+            result['peak_bytes'] / 1024.0, result['blocks']))
+
+    results = run_suite(args.width, args.depth, args.repeat, report)
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=1, sort_keys=True)
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print('REGRESSION: ' + regression)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -39,60 +39,270 @@ supported in the future):
     * ``<child>`` elements with an "internal-child" attribute.
 """
 
+from . import _async, _cache, _check, _images, _stream
+from ._instrument import instrumentation
+from ._model import load_rows
+from ._plan import NotifyCounter
+from ._pool import Pool
+from ._registry import Registry
 from .builder import Builder
+import functools
+import io
+import os
 import xml.etree.ElementTree as ET
 import sys
 
+__version__ = '0.1'
 
-def _from_tree(tree):
+configure_cache = _cache.configure
+cache_stats = _cache.stats
+
+# Builders already generated from each document; see `Registry`.
+registry = Registry(max_size=32)
+
+# Images loaded by generated classes; see `_images.ImageCache`.
+image_cache = _images.cache
+
+
+def _from_tree(tree, **options):
     """Build classes from an element tree.
 
     Returns a dict mapping the id attributes of elements to the corresponding
-    generated classes.
+    generated classes. Keyword arguments are passed on to `Builder`.
     """
     if isinstance(tree, ET.Element):
         root = tree
     else:
         root = tree.getroot()
-    result = Builder()
+    result = Builder(**options)
     result._from_root(root)
     return result
 
 
-def from_string(input):
+def from_string(input, **options):
     """Generate classes from the string ``input``
 
     Returns a dict mapping the id attributes of elements to the corresponding
-    generated classes.
+    generated classes. Keyword arguments are passed on to `Builder`.
+
+    Loading the same string again returns the same classes; see `registry`.
     """
-    return _from_tree(ET.fromstring(input))
+    return registry.get(input, options,
+                        lambda: _parse(_from_string, input, **options))
+
+
+def _from_string(input, **options):
+    if isinstance(input, bytes):
+        return _from_bytes(input, **options)
+    # Text is given to expat as text, so that it ignores any encoding the
+    # document declares; it is only encoded to find out whether it has been
+    # validated.
+    contents = input.encode('utf-8')
+    parsed = _stream.parse(io.StringIO(input),
+                           trusted=_check.validated(contents))
+    return _from_parsed(contents, parsed, **options)
+
 
+def _parse(function, *args, **options):
+    """Call ``function(*args, **options)``, which parses a document.
+
+    If `instrumentation` is enabled, the time taken is recorded against the
+    ``source`` option.
+    """
+    if instrumentation.enabled:
+        return instrumentation.parse(
+            options.get('source'),
+            functools.partial(function, *args, **options))
+    return function(*args, **options)
+
+
+def _from_stream(stream, trusted=False, **options):
+    """Build classes from the glade file `stream`, in a single pass.
+
+    `stream` is a filename or a binary file object. See `_stream.load`.
+    """
+    result = Builder(**options)
+    _stream.load(stream, result, trusted=trusted)
+    return result
 
-def from_filename(filename):
+
+def _from_bytes(contents, **options):
+    """Build classes from the contents of a glade file, in a single pass.
+
+    Contents which have been loaded without errors before are not validated
+    again; see `_check.validated`.
+    """
+    parsed = _stream.parse(io.BytesIO(contents),
+                           trusted=_check.validated(contents))
+    return _from_parsed(contents, parsed, **options)
+
+
+def _from_parsed(contents, parsed, **options):
+    """Build classes from `parsed`, returned by `_stream.parse` for `contents`.
+
+    Once the classes have been declared without errors, `contents` is
+    marked as validated.
+    """
+    result = Builder(**options)
+    _stream.declare(parsed, result)
+    _check.mark_validated(contents)
+    return result
+
+
+def from_filename(filename, **options):
     """Generate classes from the glade file named ``filename``
 
     Returns a dict mapping the id attributes of elements to the corresponding
-    generated classes.
+    generated classes. Keyword arguments are passed on to `Builder`.
+
+    The file is parsed, validated and converted in a single streaming pass,
+    so large files are never held in memory as a whole tree.
+
+    Image files named by properties are looked for relative to the directory
+    containing ``filename``, unless a `directory` is passed to `Builder`.
+
+    Loading the same file again returns the same classes; see `registry`.
+    Unless the cache has been disabled (see `configure_cache`), the result of
+    processing the file is also saved on disk, and reused the next time the
+    same file is loaded. `cache_stats` reports how often this happens.
+    """
+    options.setdefault('directory',
+                       os.path.dirname(os.path.abspath(filename)))
+    options.setdefault('source', filename)
+    if not registry.max_size and not _cache.enabled():
+        return _parse(_from_stream, filename, **options)
+
+    with open(filename, 'rb') as f:
+        contents = f.read()
+    return registry.get(contents, options,
+                        lambda: _from_contents(contents, **options))
+
+
+def from_filename_async(filename, callback=None, **options):
+    """Like `from_filename`, but with most of the work in a worker thread.
+
+    Reading the file, and either reading its entry in the on-disk cache or
+    parsing and checking it (see `_stream.parse`), happen in a worker
+    thread. None of this uses GI, which is not thread safe. The rest happens
+    in the calling thread, from its event loop (asyncio's if it is running
+    one, GLib's main loop otherwise): resolving the Gtk classes and
+    converting property values, which needs them, and registering the
+    result in `registry`.
+
+    Returns a future, which may be awaited from a coroutine::
+
+        builder = await from_filename_async('plugin.glade')
+
+    or passed, once done, to `callback`, which is called from the event
+    loop. ``future.result()`` returns the builder, or raises whatever
+    exception `from_filename` would have raised (such as `BadInput`).
     """
-    return _from_tree(ET.parse(filename))
+    options.setdefault('directory',
+                       os.path.dirname(os.path.abspath(filename)))
+    options.setdefault('source', filename)
+
+    def work():
+        with open(filename, 'rb') as f:
+            contents = f.read()
+        cache_key, entry = _read_cache(contents)
+        parsed = None
+        if entry is None:
+            parsed = _stream.parse(io.BytesIO(contents),
+                                   trusted=_check.validated(contents))
+        return contents, cache_key, entry, parsed
+
+    def finish(prepared):
+        contents, cache_key, entry, parsed = prepared
+
+        def load():
+            result, store_key = _parse(_restore_or_parse, contents,
+                                       cache_key, entry, parsed, **options)
+            if store_key is not None:
+                _cache.store(store_key, result._to_records)
+            return result
+
+        return registry.get(contents, options, load)
+
+    return _async.run(work, finish, callback)
+
+
+def _from_contents(contents, **options):
+    """Build classes from the contents of a glade file, using the cache."""
+    result, cache_key = _parse(_parse_contents, contents, **options)
+    if cache_key is not None:
+        _cache.store(cache_key, result._to_records)
+    return result
+
+
+def _parse_contents(contents, **options):
+    """Prepare to build classes from the contents of a glade file.
+
+    Returns the `Builder`, and the cache key under which it should be stored
+    (None if it was loaded from the cache, or the cache is disabled). No
+    classes are generated yet.
+    """
+    cache_key, entry = _read_cache(contents)
+    return _restore_or_parse(contents, cache_key, entry, **options)
+
+
+def _read_cache(contents):
+    """Return the cache key for `contents`, and its entry in the cache.
+
+    Both are None if the cache is disabled; the entry is None if there is
+    none.
+    """
+    if not _cache.enabled():
+        return None, None
+    cache_key = _cache.key(contents)
+    return cache_key, _cache.read(cache_key)
+
+
+def _restore_or_parse(contents, cache_key, entry, parsed=None, **options):
+    """Like `_parse_contents`, given the result of `_read_cache`.
+
+    If `parsed` is not None, it is the result of `_stream.parse` for
+    `contents`, which is used rather than parsing them again.
+    """
+    def restore(records):
+        result = Builder(**options)
+        result._from_records(records)
+        return result
+
+    result = _cache.decode(cache_key, entry, restore)
+    if result is not None:
+        return result, None
+    if parsed is None:
+        return _from_bytes(contents, **options), cache_key
+    return _from_parsed(contents, parsed, **options), cache_key
 
 
 class _ModuleProxy(object):
     """Helper class for the implementation of "replace_module".
 
     replace module replaces the underlying module in `sys.modules` with an
-    instance of this class.
+    instance of this class. The glade file is not read until one of its
+    classes is first accessed.
     """
 
     def __init__(self, module):
-        gladefile = module.__file__.replace('.py', '.glade')
-        self.builder = from_filename(gladefile)
+        self._gladefile = module.__file__.replace('.py', '.glade')
+        self._builder = None
+
+    @property
+    def builder(self):
+        if self._builder is None:
+            self._builder = from_filename(self._gladefile)
+        return self._builder
 
     def __getattr__(self, name):
+        if name.startswith('__'):
+            # The import machinery probes modules for attributes such as
+            # __path__; don't load the glade file just to answer that.
+            raise AttributeError(name)
         try:
             return self.builder[name]
         except KeyError:
-            raise AttributeError
+            raise AttributeError(name)
 
 
 def replace_module(name):
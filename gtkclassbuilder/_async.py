@@ -0,0 +1,87 @@
+"""Doing work in a worker thread, and finishing it in the main thread.
+
+This is the machinery behind `from_filename_async`. Generated classes, and
+the objects they create, must only be touched from the thread running the
+main loop, but reading and parsing a glade file need not be. `run` calls a
+`work` function in a worker thread, then hands its result to a `finish`
+function in the main thread, and reports the outcome through a `Future`.
+
+The "main thread" is whichever thread called `run`. If it is running an
+asyncio event loop, `finish` is called from that loop; otherwise it is
+called from the GLib main loop, which must be running for the result to
+arrive.
+"""
+from ._utils import gi_module
+
+import concurrent.futures
+import sys
+import threading
+
+
+class Future(concurrent.futures.Future):
+    """A ``concurrent.futures.Future`` which asyncio coroutines can await.
+
+    Its result is always set in the main thread, so callbacks added with
+    ``add_done_callback`` are called there too.
+    """
+
+    def __await__(self):
+        # asyncio is slow to import, so it is only imported when needed.
+        import asyncio
+        return asyncio.wrap_future(self).__await__()
+
+
+def run(work, finish, callback=None):
+    """Call `work` in a worker thread, then `finish` in the main thread.
+
+    `finish` is passed the value returned by `work`. Returns a `Future` for
+    the value returned by `finish`; if either function raises an exception,
+    the future holds that exception instead. If `callback` is given, it is
+    called in the main thread with the future once it is done.
+    """
+    future = Future()
+    dispatch = _dispatcher()
+
+    def complete(function, arg):
+        if future.set_running_or_notify_cancel():
+            try:
+                future.set_result(function(arg))
+            except Exception as e:
+                future.set_exception(e)
+            if callback is not None:
+                callback(future)
+        return False
+
+    def worker():
+        try:
+            result = work()
+        except Exception as e:
+            dispatch(complete, _reraise, e)
+        else:
+            dispatch(complete, finish, result)
+
+    thread = threading.Thread(target=worker, name='gtkclassbuilder-loader')
+    thread.daemon = True
+    thread.start()
+    return future
+
+
+def _dispatcher():
+    """Return a function which calls a function in the current thread.
+
+    The returned function may be called from any thread; the function passed
+    to it is called from this thread's event loop.
+    """
+    # If asyncio hasn't been imported, no asyncio loop can be running, so
+    # there is no need to import it here.
+    asyncio = sys.modules.get('asyncio')
+    if asyncio is not None:
+        try:
+            return asyncio.get_running_loop().call_soon_threadsafe
+        except RuntimeError:
+            pass
+    return gi_module('GLib').idle_add
+
+
+def _reraise(exception):
+    raise exception
@@ -0,0 +1,177 @@
+"""On-disk cache of processed glade files.
+
+`load` and `store` save the classes generated from a glade file (as
+returned by `Builder._to_records`) in a cache directory, keyed by a hash of
+the file's contents and the version of this library. A later `from_filename`
+on an unchanged file can then recreate the classes without parsing,
+validating or converting anything.
+
+The cache directory is ``$GTKCLASSBUILDER_CACHE_DIR`` if set, otherwise
+``gtkclassbuilder`` inside ``$XDG_CACHE_HOME`` (``~/.cache`` by default). It
+may be changed with `configure`. Setting ``GTKCLASSBUILDER_CACHE=0`` in the
+environment disables the cache.
+
+Entries which cannot be read, or whose contents don't match their key, are
+discarded and rebuilt.
+"""
+from ._check import BadInput
+
+import hashlib
+import json
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+# Bump this whenever the format of the records changes.
+FORMAT = 4
+
+_config = {
+    'directory': None,
+    'enabled': os.environ.get('GTKCLASSBUILDER_CACHE', '1') != '0',
+}
+
+_stats = {
+    'hits': 0,
+    'misses': 0,
+    'errors': 0,
+    'writes': 0,
+}
+
+
+def configure(directory=None, enabled=True):
+    """Configure the on-disk cache.
+
+    :param directory: the directory to store cache entries in. If None, the
+        default location (described in the module docstring) is used.
+    :param enabled: whether `from_filename` should use the cache at all.
+    """
+    _config['directory'] = directory
+    _config['enabled'] = enabled
+
+
+def stats():
+    """Return a dict of counters describing the use of the cache.
+
+    The keys are ``hits``, ``misses`` (including stale entries), ``errors``
+    (corrupt entries, and failures to write) and ``writes``.
+    """
+    return dict(_stats)
+
+
+def reset_stats():
+    """Reset all of the counters returned by `stats` to zero."""
+    for key in _stats:
+        _stats[key] = 0
+
+
+def enabled():
+    return _config['enabled']
+
+
+def directory():
+    """Return the directory in which cache entries are stored."""
+    if _config['directory'] is not None:
+        return _config['directory']
+    if 'GTKCLASSBUILDER_CACHE_DIR' in os.environ:
+        return os.environ['GTKCLASSBUILDER_CACHE_DIR']
+    base = os.environ.get('XDG_CACHE_HOME') or \
+        os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'gtkclassbuilder')
+
+
+def key(contents):
+    """Return the cache key for a glade file with the given `contents`.
+
+    `contents` is the content of the file, as bytes.
+    """
+    from . import __version__
+    digest = hashlib.sha256(contents)
+    digest.update(('\0%s\0%d' % (__version__, FORMAT)).encode('ascii'))
+    return digest.hexdigest()
+
+
+def _path(cache_key):
+    return os.path.join(directory(), cache_key + '.json')
+
+
+def load(cache_key, restore):
+    """Load the entry stored under `cache_key`.
+
+    `restore` is called with the stored records, and its result is returned.
+    If there is no such entry, None is returned instead. If the entry is
+    corrupt (including if `restore` fails on it) it is removed, so that it
+    will be rebuilt, and None is returned.
+    """
+    return decode(cache_key, read(cache_key), restore)
+
+
+def read(cache_key):
+    """Read the entry stored under `cache_key`, without decoding it.
+
+    Returns None if there is no such entry, or if it can't be read (in which
+    case it is removed). Unlike `load`, the entry is not restored; pass the
+    result to `decode`.
+    """
+    path = _path(cache_key)
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (IOError, OSError):
+        _stats['misses'] += 1
+        return None
+    except ValueError as e:
+        return _corrupt(cache_key, e)
+
+
+def decode(cache_key, entry, restore):
+    """Restore `entry`, as read by `read`; see `load`."""
+    if entry is None:
+        return None
+    try:
+        if entry['key'] != cache_key:
+            raise ValueError("Cache entry has the wrong key")
+        result = restore(entry['records'])
+    except (ValueError, KeyError, TypeError, AttributeError,
+            ImportError, BadInput) as e:
+        return _corrupt(cache_key, e)
+    _stats['hits'] += 1
+    return result
+
+
+def _corrupt(cache_key, exn):
+    logger.debug("Discarding corrupt cache entry %r: %s", cache_key, exn)
+    _stats['errors'] += 1
+    _stats['misses'] += 1
+    discard(cache_key)
+    return None
+
+
+def store(cache_key, dump):
+    """Store the records returned by calling `dump` under `cache_key`.
+
+    Failures (e.g. due to a read-only cache directory, or values which
+    can't be stored) are logged and otherwise ignored.
+    """
+    path = _path(cache_key)
+    tmp_path = '%s.%d.tmp' % (path, os.getpid())
+    try:
+        entry = {'key': cache_key, 'records': dump()}
+        if not os.path.isdir(directory()):
+            os.makedirs(directory())
+        with open(tmp_path, 'w') as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, path)
+    except (IOError, OSError, ValueError) as e:
+        logger.debug("Failed to write cache entry %r: %s", path, e)
+        _stats['errors'] += 1
+        return
+    _stats['writes'] += 1
+
+
+def discard(cache_key):
+    """Remove the entry stored under `cache_key`, if any."""
+    try:
+        os.remove(_path(cache_key))
+    except (IOError, OSError):
+        pass
@@ -1,123 +1,303 @@
 """This module check the validity of an element read from a ``.glade`` file.
 
-passing the root element to `interface` will verify that the xml tree
-beneath it conforms to the requirements of this library. It is so named since
-the root element must be an ``<interface>`` element. If the xml tree is
-invalid, an exception of type `BadInput` will be raised.
+The rules are kept in a table, `_RULES`, which gives the attributes each
+element must and may have, and which child elements it may contain. A
+`Validator` applies them to elements one at a time, as they are opened and
+closed, so that the streaming loader in `._stream` can check a document in
+the same pass which parses and converts it. `interface` does the same for a
+whole tree, given its root element, which must be an ``<interface>``
+element.
+
+Problems are not raised as soon as they are found. Instead, they are
+collected in a `Report`, along with the line they were found on, so that
+every error in a document is reported at once, as a single `BadInput`.
+Warnings (such as unrecognized attributes) are only formatted and logged if
+warnings are enabled.
+
+Documents which have been loaded without errors are remembered by content
+hash (see `validated`); loading the same content again skips the checks
+altogether.
 """
+import hashlib
 import logging
 
 logger = logging.getLogger(__name__)
 
 
 class BadInput(Exception):
-    """An error indicating failure to validate the input."""
-    pass
+    """An error indicating failure to validate the input.
+
+    `errors` is a list of ``(line, message)`` pairs, one for each problem
+    found in the document; `line` is None if it is not known.
+    """
 
+    def __init__(self, message, errors=None):
+        Exception.__init__(self, message)
+        if errors is None:
+            errors = [(None, message)]
+        self.errors = errors
 
-def _or_raise(test, exn):
-    """Raise exn if test is False."""
-    if not test:
-        raise exn
 
+def _located(line, message):
+    if line is None:
+        return message
+    return 'line %d: %s' % (line, message)
 
-def _check_attrs(elt, required=(), recognized=()):
-    """Verify that elt has each of the elements in `required`.
 
-    :param elt: is the element to check.
-    :param required: must be a tuple or list of strings, each of which is the
-        name of a required attribute.
-    :param recognized: is a list of additional attributes that `elt` may also
-        have.
+class Report(object):
+    """The errors and warnings found in a document.
 
-    If `elt` has an attribute that is not in either required or recognized,
-    a warning will be logged. If it is missing any elements in required, a
-    `BadInput` exception will be raised.
+    Messages are stored as a format string and its arguments, and only
+    formatted when they are needed.
     """
-    required = set(required)
-    recognized = set(recognized)
-    for attr in elt.attrib:
-        if attr in required:
-            required.remove(attr)
-        elif attr not in recognized:
-            logger.warn("Unrecognized attribute %r for %r element" %
-                        (attr, elt.tag))
-    _or_raise(len(required) == 0,
-              BadInput("element %r is missing required elements: %r" %
-                       (elt.tag, list(required))))
+
+    __slots__ = ('errors', 'warnings')
+
+    def __init__(self):
+        self.errors = []
+        self.warnings = []
+
+    def error(self, line, message, *args):
+        self.errors.append((line, message, args))
+
+    def warning(self, line, message, *args):
+        self.warnings.append((line, message, args))
+
+    def finish(self):
+        """Log the warnings, then raise `BadInput` if there were errors."""
+        if self.warnings and logger.isEnabledFor(logging.WARNING):
+            for line, message, args in self.warnings:
+                logger.warning(_located(line, message % args))
+        if self.errors:
+            # Errors found converting values are only reported once the
+            # object they belong to is complete, so put them in order.
+            errors = sorted([(line, message % args)
+                             for line, message, args in self.errors],
+                            key=lambda error: error[0] or 0)
+            if len(errors) == 1:
+                summary = _located(*errors[0])
+            else:
+                summary = '%d errors:\n%s' % (
+                    len(errors),
+                    '\n'.join('  ' + _located(line, message)
+                              for line, message in errors))
+            raise BadInput(summary, errors)
+
+
+class _Rule(object):
+    """How to check one kind of element.
+
+    `required` and `recognized` are the attributes which the element must,
+    and may, have; any others are warned about. `children` lists the tags of
+    the child elements which are checked, by their own rules in `_RULES`.
+    What happens to other children depends on `other`: if it is None they
+    are ignored, if it is True they are warned about, and otherwise it is the
+    message of the error they cause.
+
+    If `positions` is not empty, the children are checked by position
+    instead: it is a list of ``(tag, message)`` pairs, giving the tag which
+    the child in each position must have, and the error if it doesn't.
+    Children beyond the end of the list are ignored.
+
+    `check` is called with the `Validator`, the element and its line when
+    the element is opened, and `finish` with the `Validator`, the element,
+    its line and the number of child elements it had when it is closed.
+    """
+
+    __slots__ = ('tag', 'required', 'recognized', 'children', 'other',
+                 'positions', 'check', 'finish')
+
+    def __init__(self, tag, required=(), recognized=(), children=(),
+                 other=None, positions=(), check=None, finish=None):
+        self.tag = tag
+        self.required = required
+        self.recognized = frozenset(recognized)
+        self.children = frozenset(children)
+        self.other = other
+        self.positions = positions
+        self.check = check
+        self.finish = finish
+
+
+def _check_object(validator, elt, line):
+    cls = elt.get('class')
+    if cls is not None and not cls.startswith('Gtk'):
+        validator.report.error(line, "Object has non Gtk class: %r", cls)
+
+
+def _finish_property(validator, elt, line, num_children):
+    if num_children:
+        validator.report.error(line, "Property with non-text child")
+    elif not elt.text:
+        validator.report.error(line, "Property with no text")
+
+
+def _check_col(validator, elt, line):
+    column = elt.get('id')
+    if column is not None and not column.isdigit():
+        validator.report.error(line, "Invalid column number %r", column)
+
+
+def _finish_child(validator, elt, line, num_children):
+    if not num_children:
+        validator.report.error(line, "Child with no child elements")
+
+
+def _finish_interface(validator, elt, line, num_children):
+    if not num_children:
+        validator.report.error(line, 'Interface with no children')
+    elif not validator.have_object:
+        validator.report.error(line, 'Interface has no object child')
+
+
+# The rules for each kind of element, by tag. The rule of the root element
+# is that of <interface>; the rules of the others are looked up here once
+# the rule of their parent has allowed them.
+_RULES = dict((rule.tag, rule) for rule in [
+    _Rule('interface', children=['object'], other=True,
+          finish=_finish_interface),
+    _Rule('object', required=['id', 'class'], recognized=['signal'],
+          children=['property', 'child', 'signal', 'columns', 'data'],
+          check=_check_object),
+    _Rule('property', required=['name'], finish=_finish_property),
+    _Rule('signal', required=['name', 'handler']),
+    _Rule('child', positions=[
+        ('object', "First child of child element is not an object"),
+        ('packing', "Second child of child element is not packing"),
+    ], finish=_finish_child),
+    _Rule('packing', children=['property'],
+          other='Child of packing is not a property'),
+    _Rule('columns', children=['column'],
+          other='Child of columns is not a column'),
+    _Rule('column', required=['type']),
+    _Rule('data', children=['row'], other='Child of data is not a row'),
+    _Rule('row', children=['col'], other='Child of row is not a col'),
+    _Rule('col', required=['id'],
+          recognized=['translatable', 'context', 'comments'],
+          check=_check_col),
+])
+
+
+class Validator(object):
+    """Checks a document one element at a time.
+
+    `start` and `end` must be called as each element is opened and closed,
+    in document order. Problems are added to `report`; call
+    ``report.finish()`` once the document is complete.
+    """
+
+    __slots__ = ('report', 'have_object', '_stack')
+
+    def __init__(self, report):
+        self.report = report
+        self.have_object = False
+        # A [rule, element, line, number of children] list for each open
+        # element; rule is None for elements which aren't checked.
+        self._stack = []
+
+    def start(self, elt, line=None):
+        """Check the element `elt`, which has just been opened.
+
+        Returns False if any errors were found in `elt` itself (as opposed
+        to its children, which haven't been read yet).
+        """
+        report = self.report
+        num_errors = len(report.errors)
+        stack = self._stack
+        if stack:
+            parent = stack[-1]
+            parent[3] += 1
+            rule = self._rule(parent, elt, line)
+        elif elt.tag == 'interface':
+            rule = _RULES['interface']
+        else:
+            self.report.error(line, "Expected 'interface' element but got %r",
+                              elt.tag)
+            rule = None
+        stack.append([rule, elt, line, 0])
+        if rule is None:
+            return len(report.errors) == num_errors
+        attrib = elt.attrib
+        missing = [attr for attr in rule.required if attr not in attrib]
+        if missing:
+            report.error(line, "element %r is missing required elements: %r",
+                         elt.tag, missing)
+        for attr in attrib:
+            if attr not in rule.recognized and attr not in rule.required:
+                report.warning(line, "Unrecognized attribute %r for %r "
+                               "element", attr, elt.tag)
+        if rule.check is not None:
+            rule.check(self, elt, line)
+        return len(report.errors) == num_errors
+
+    def _rule(self, parent, elt, line):
+        """Return the rule for `elt`, a child of the element `parent`."""
+        rule = parent[0]
+        if rule is None:
+            return None
+        if rule.positions:
+            position = parent[3] - 1
+            if position < len(rule.positions):
+                tag, message = rule.positions[position]
+                if elt.tag == tag:
+                    return _RULES[tag]
+                self.report.error(line, message)
+            return None
+        if elt.tag in rule.children:
+            if rule.tag == 'interface':
+                self.have_object = True
+            return _RULES[elt.tag]
+        if rule.other is True:
+            self.report.warning(line, 'Unrecognized element %r', elt.tag)
+        elif rule.other is not None:
+            self.report.error(line, rule.other)
+        return None
+
+    def end(self, elt):
+        """Finish checking the element `elt`, which has just been closed."""
+        rule, _, line, num_children = self._stack.pop()
+        if rule is not None and rule.finish is not None:
+            rule.finish(self, elt, line, num_children)
 
 
 def interface(elt):
-    """Validate the ``<interface>`` element `elt`.
+    """Validate the ``<interface>`` element `elt`, and everything in it.
 
     The root element in a glade file must be an interface element, therefore
     this function may be used to validate the entire document.
 
-    If the element does not validate, a `BadInput` exception will be raised.
+    If the element does not validate, a `BadInput` exception describing
+    every problem found will be raised.
     """
-    _or_raise(elt.tag == 'interface',
-              BadInput("Expected 'interface' element but got %r" % elt.tag))
-    _check_attrs(elt)
-    children = list(filter(lambda e: e.tag == 'object', elt))
-    children = list(elt)
-    _or_raise(len(children) > 0,
-              BadInput('Interface with no children'))
-    have_object = False
-    for child in children:
-        if child.tag == 'object':
-            have_object = True
-            _object(child)
-        else:
-            logger.warn('Unrecognized element %r' % child.tag)
-    _or_raise(have_object, BadInput('Interface has no object child'))
-
-
-# The remainder of these functions are like `interface` but for differnet
-# elements corresponding to their names; _object for <object>, _property for
-# <property>, and so on.
-
-
-def _object(elt):
-    _check_attrs(elt, ['id', 'class'], ['signal'])
-    _or_raise(elt.attrib['class'].startswith('Gtk'),
-              BadInput("Object has non Gtk class: %r" % elt.attrib['class']))
-    for child in elt:
-        if child.tag == 'property':
-            _property(child)
-        elif child.tag == 'child':
-            _child(child)
-        elif child.tag == 'signal':
-            _signal(child)
-
-
-def _property(elt):
-    _check_attrs(elt, ['name'])
-    _or_raise('name' in elt.attrib, BadInput("Property with no name"))
-    _or_raise(len(list(elt)) == 0, BadInput("Property with non-text child"))
-    _or_raise(len(list(elt.itertext())) == 1,
-              BadInput("Property with more than one child"))
-
-
-def _signal(elt):
-    _check_attrs(elt, ['name', 'handler'])
-
-
-def _child(elt):
-    _check_attrs(elt)
-    children = list(elt)
-    _or_raise(len(children) > 0, BadInput("Child with no child elements"))
-    _or_raise(children[0].tag == 'object',
-              BadInput("First child of child element is not an object"))
-    if len(children) > 1:
-        _or_raise(children[1].tag == 'packing',
-                  BadInput("Second child of child element is not packing"))
-        _packing(children[1])
-    _object(children[0])
-
-
-def _packing(elt):
-    _check_attrs(elt)
-    for child in elt:
-        _or_raise(child.tag == 'property',
-                  BadInput('Child of packing is not a property'))
-        _property(child)
+    report = Report()
+    validator = Validator(report)
+
+    def walk(elt):
+        validator.start(elt)
+        for child in elt:
+            walk(child)
+        validator.end(elt)
+
+    walk(elt)
+    report.finish()
+
+
+# The content hashes of the documents which have been loaded without errors.
+_validated = set()
+
+
+def _digest(contents):
+    return hashlib.sha256(contents).hexdigest()
+
+
+def validated(contents):
+    """Return whether a document with `contents` has been validated.
+
+    `contents` is the content of the document, as bytes.
+    """
+    return _digest(contents) in _validated
+
+
+def mark_validated(contents):
+    """Record that a document with `contents` has been validated."""
+    _validated.add(_digest(contents))
@@ -0,0 +1,249 @@
+"""Conversion of the textual property values found in ``.glade`` files.
+
+Values in a glade file are always text. `convert` uses the ``GParamSpec``
+of the property being set to turn that text into a python value of the
+appropriate type, so that the conversion happens once, when the class is
+generated, rather than every time it is instantiated. `convert_column` does
+the same for the rows of list stores, using the types of their columns.
+"""
+from ._check import BadInput
+from ._images import Image
+from ._utils import gi_module
+
+
+_TRUE = frozenset(['true', 't', 'yes', 'y', '1'])
+_FALSE = frozenset(['false', 'f', 'no', 'n', '0'])
+
+# The names of fundamental types. Types are compared by name, so that
+# GObject need not be imported until a value is converted.
+_INTEGER_TYPES = frozenset([
+    'gchar',
+    'guchar',
+    'gint',
+    'guint',
+    'glong',
+    'gulong',
+    'gint64',
+    'guint64',
+])
+
+_FLOAT_TYPES = frozenset([
+    'gfloat',
+    'gdouble',
+])
+
+
+def find_property(cls, name):
+    """Return the ``GParamSpec`` for the property `name` of `cls`.
+
+    Returns None if `cls` has no such property.
+    """
+    return _find(getattr(cls, 'find_property', None), name)
+
+
+def find_child_property(cls, name):
+    """Return the ``GParamSpec`` for the child property `name` of `cls`.
+
+    `cls` should be a container class. Returns None if `cls` has no such
+    child property.
+    """
+    return _find(getattr(cls, 'find_child_property', None), name)
+
+
+def _find(lookup, name):
+    if lookup is None:
+        return None
+    try:
+        return lookup(name.replace('_', '-'))
+    except (TypeError, AttributeError):
+        return None
+
+
+def is_reference(pspec):
+    """Return whether values of `pspec` refer to other objects by id."""
+    GObject = gi_module('GObject')
+    return GObject.type_is_a(pspec.value_type, GObject.TYPE_OBJECT)
+
+
+def convert(pspec, text):
+    """Convert the string `text` to a value suitable for the property `pspec`.
+
+    Raises `BadInput` if `text` cannot be converted.
+    """
+    try:
+        return _convert(pspec.value_type, text,
+                        lambda: type(pspec.default_value))
+    except (ValueError, KeyError, RuntimeError):
+        raise BadInput("Invalid value %r for property %r of type %s" %
+                       (text, pspec.name, pspec.value_type.name))
+
+
+def convert_column(gtype, text, column):
+    """Convert the string `text` to a value for a model column.
+
+    `gtype` is the type of the column and `column` its number. Raises
+    `BadInput` if `text` cannot be converted.
+    """
+    try:
+        return _convert(gtype, text, lambda: gtype.pytype)
+    except (ValueError, KeyError, RuntimeError, AttributeError):
+        raise BadInput("Invalid value %r for column %d of type %s" %
+                       (text, column, gtype.name))
+
+
+def _convert(gtype, text, value_class):
+    """Convert `text` to a value of type `gtype`.
+
+    `value_class` is called to find the python class of enum and flags
+    types.
+    """
+    fundamental = gtype.fundamental.name
+    if fundamental == 'gchararray':
+        return text
+    if fundamental == 'gboolean':
+        return _to_bool(text)
+    if fundamental in _INTEGER_TYPES:
+        return int(text)
+    if fundamental in _FLOAT_TYPES:
+        return float(text)
+    if fundamental == 'GEnum':
+        return _to_enum(value_class(), text)
+    if fundamental == 'GFlags':
+        return _to_flags(value_class(), text)
+    if fundamental == 'GType':
+        return gi_module('GObject').type_from_name(text)
+    if fundamental == 'GBoxed':
+        return _to_boxed(gtype.name, text)
+    return guess(text)
+
+
+def guess(text):
+    """Try to guess the correct type based on the text.
+
+    This is used for properties which could not be found on the class
+    being generated. Return the corresponding value.
+    """
+    if text == 'True':
+        return True
+    if text == 'False':
+        return False
+    try:
+        return int(text)
+    except ValueError:
+        return text
+
+
+def _to_bool(text):
+    lowered = text.strip().lower()
+    if lowered in _TRUE:
+        return True
+    if lowered in _FALSE:
+        return False
+    raise ValueError(text)
+
+
+def _member(values, text, nick_of, name_of):
+    """Find the member of `values` named by `text`.
+
+    `values` is the ``__enum_values__`` or ``__flags_values__`` table of
+    a gi enum or flags type. `text` may be the member's nick (e.g.
+    ``vertical``), its full C name (e.g. ``GTK_ORIENTATION_VERTICAL``) or an
+    integer.
+    """
+    text = text.strip()
+    nick = text.replace('_', '-').lower()
+    for value in values.values():
+        if nick_of(value) == nick or name_of(value) == text:
+            return int(value)
+    return int(text)
+
+
+def _to_enum(enum_class, text):
+    return enum_class(_member(enum_class.__enum_values__, text,
+                              lambda v: v.value_nick,
+                              lambda v: v.value_name))
+
+
+def _to_flags(flags_class, text):
+    result = 0
+    for part in text.split('|'):
+        if part.strip():
+            result |= _member(flags_class.__flags_values__, part,
+                              lambda v: v.first_value_nick,
+                              lambda v: v.first_value_name)
+    return flags_class(result)
+
+
+def _to_boxed(type_name, text):
+    if type_name == 'GdkRGBA':
+        rgba = gi_module('Gdk').RGBA()
+        if not rgba.parse(text):
+            raise ValueError(text)
+        return rgba
+    if type_name == 'GdkColor':
+        found, color = gi_module('Gdk').Color.parse(text)
+        if not found:
+            raise ValueError(text)
+        return color
+    return guess(text)
+
+
+# encode and decode convert values returned by `convert` to and from a form
+# which can be stored as json, for use by the on-disk cache.
+
+
+def encode(value):
+    """Return a json-compatible representation of the converted `value`."""
+    if value is None or isinstance(value, (bool, float, str)):
+        return value
+    GObject = gi_module('GObject')
+    if isinstance(value, GObject.GEnum):
+        return {'enum': class_name(type(value)), 'value': int(value)}
+    if isinstance(value, GObject.GFlags):
+        return {'flags': class_name(type(value)), 'value': int(value)}
+    if isinstance(value, int):
+        return value
+    if isinstance(value, GObject.GType):
+        return {'gtype': value.name}
+    if isinstance(value, Image):
+        return {'image': value.source, 'resource': value.resource,
+                'widget': value.widget}
+    type_name = type(value).__name__
+    if type_name == 'RGBA':
+        return {'rgba': [value.red, value.green, value.blue, value.alpha]}
+    if type_name == 'Color':
+        return {'color': [value.red, value.green, value.blue]}
+    raise ValueError("Can't encode value %r" % (value,))
+
+
+def decode(data):
+    """Inverse of `encode`."""
+    if not isinstance(data, dict):
+        return data
+    if 'enum' in data:
+        return class_by_name(data['enum'])(data['value'])
+    if 'flags' in data:
+        return class_by_name(data['flags'])(data['value'])
+    if 'gtype' in data:
+        return gi_module('GObject').type_from_name(data['gtype'])
+    if 'image' in data:
+        return Image(data['image'], resource=data['resource'],
+                     widget=data['widget'])
+    if 'rgba' in data:
+        red, green, blue, alpha = data['rgba']
+        return class_by_name('Gdk.RGBA')(red=red, green=green, blue=blue,
+                                         alpha=alpha)
+    if 'color' in data:
+        return class_by_name('Gdk.Color')(*data['color'])
+    raise ValueError("Can't decode value %r" % (data,))
+
+
+def class_name(cls):
+    """Return the name of the gi class `cls`, e.g. ``Gtk.Orientation``."""
+    return '%s.%s' % (cls.__module__.rsplit('.', 1)[-1], cls.__name__)
+
+
+def class_by_name(name):
+    """Inverse of `class_name`."""
+    namespace, name = name.split('.')
+    return getattr(gi_module(namespace), name)
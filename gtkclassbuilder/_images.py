@@ -0,0 +1,189 @@
+"""Images loaded from files and resources, shared between instances.
+
+Properties whose value is a ``GdkPixbuf`` (such as the ``pixbuf`` of a
+``GtkImage``, or the ``icon`` of a ``GtkWindow``) name an image file in the
+glade file, as do the ``file`` and ``resource`` properties of ``GtkImage``.
+`from_property` turns such values into an `Image`; instead of having every
+instance load and decode its own copy, `Image.apply` fetches the decoded
+image from `cache`, an `ImageCache`, which keeps each one in memory once.
+"""
+from ._utils import gi_module
+
+import collections
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+# The string properties of GtkImage which name an image to load.
+_IMAGE_PROPERTIES = frozenset(['file', 'resource'])
+
+
+class Image(object):
+    """An image file or resource named by a property.
+
+    `source` is the file name, or the resource path if `resource` is True.
+    If `widget` is True, the property is one of the string properties of
+    ``GtkImage`` (``file`` or ``resource``), which is set through the
+    ``pixbuf`` or ``pixbuf-animation`` property instead.
+    """
+
+    __slots__ = ('source', 'resource', 'widget')
+
+    def __init__(self, source, resource=False, widget=False):
+        self.source = source
+        self.resource = resource
+        self.widget = widget
+
+    def __repr__(self):
+        return 'Image(%r, resource=%r, widget=%r)' % (
+            self.source, self.resource, self.widget)
+
+    def resolve(self, directory):
+        """Return this image, with a relative file name made absolute.
+
+        `directory` is the directory the file name is relative to; if it is
+        None, the current directory is used.
+        """
+        if self.resource or os.path.isabs(self.source):
+            return self
+        return Image(os.path.abspath(os.path.join(directory or '',
+                                                  self.source)),
+                     widget=self.widget)
+
+    def apply(self, obj, key):
+        """Set the property `key` of `obj` to this image."""
+        try:
+            value = cache.get(self)
+        except gi_module('GLib').Error as e:
+            logger.warning("Failed to load image %r: %s", self.source, e)
+            if self.widget:
+                # Let the GtkImage show its "broken image" icon.
+                obj.set_property(key, self.source)
+            return
+        if self.widget:
+            if _is_animation(value):
+                key = 'pixbuf-animation'
+            else:
+                key = 'pixbuf'
+        elif _is_animation(value):
+            value = value.get_static_image()
+        obj.set_property(key, value)
+
+
+def from_property(pspec, text):
+    """Return an `Image` for the property `pspec`, or None.
+
+    `text` is the value of the property in the glade file. None is returned
+    if `pspec` is not a property which names an image.
+    """
+    if pspec.value_type.name == 'GdkPixbuf':
+        if text.startswith('resource://'):
+            return Image(text[len('resource://'):], resource=True)
+        return Image(text)
+    if pspec.owner_type.name == 'GtkImage' and \
+            pspec.name in _IMAGE_PROPERTIES:
+        return Image(text, resource=pspec.name == 'resource', widget=True)
+    return None
+
+
+class ImageCache(object):
+    """A cache of decoded images, shared by every builder.
+
+    Images are kept until the total size of their pixel data exceeds
+    `max_bytes`; then the ones used longest ago are evicted. Evicted images
+    stay alive for as long as some widget uses them, but will be loaded
+    again by the next instance which needs them.
+    """
+
+    __slots__ = ('max_bytes', '_entries', '_bytes', '_stats')
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._entries = collections.OrderedDict()
+        self._bytes = 0
+        self._stats = {
+            'hits': 0,
+            'misses': 0,
+            'evictions': 0,
+        }
+
+    def get(self, image):
+        """Return the decoded `image`, loading it if necessary.
+
+        The result is a ``GdkPixbuf.Pixbuf``, or a
+        ``GdkPixbuf.PixbufAnimation`` if the image is animated. Raises
+        ``GLib.Error`` if the image cannot be loaded.
+        """
+        key = (image.source, image.resource)
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._stats['hits'] += 1
+            self._entries.move_to_end(key)
+            return entry[0]
+        self._stats['misses'] += 1
+        value = _load(image)
+        size = _size(value)
+        self._entries[key] = (value, size)
+        self._bytes += size
+        self._trim()
+        return value
+
+    def resize(self, max_bytes):
+        """Change the maximum total size of the images in the cache."""
+        self.max_bytes = max_bytes
+        self._trim()
+
+    def clear(self):
+        """Evict all of the images."""
+        self._stats['evictions'] += len(self._entries)
+        self._entries.clear()
+        self._bytes = 0
+
+    def stats(self):
+        """Return a dict of counters describing the use of the cache.
+
+        The keys are ``hits``, ``misses``, ``evictions``, ``size`` (the
+        number of images in the cache), ``bytes`` (their total size) and
+        ``max_bytes``.
+        """
+        result = dict(self._stats)
+        result['size'] = len(self._entries)
+        result['bytes'] = self._bytes
+        result['max_bytes'] = self.max_bytes
+        return result
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _trim(self):
+        while self._bytes > self.max_bytes and self._entries:
+            _, (_, size) = self._entries.popitem(last=False)
+            self._bytes -= size
+            self._stats['evictions'] += 1
+
+
+def _load(image):
+    GdkPixbuf = gi_module('GdkPixbuf')
+    if image.resource:
+        animation = GdkPixbuf.PixbufAnimation.new_from_resource(image.source)
+    else:
+        animation = GdkPixbuf.PixbufAnimation.new_from_file(image.source)
+    if animation.is_static_image():
+        return animation.get_static_image()
+    return animation
+
+
+def _is_animation(value):
+    return hasattr(value, 'get_static_image')
+
+
+def _size(value):
+    """Return the size of the pixel data of a pixbuf or animation."""
+    if _is_animation(value):
+        value = value.get_static_image()
+    return value.get_byte_length()
+
+
+# The cache used by `Image.apply`; see `ImageCache`.
+cache = ImageCache(max_bytes=32 * 1024 * 1024)
@@ -0,0 +1,264 @@
+"""Opt-in measurement of loading and instantiation.
+
+`instrumentation`, exported by the package, is an `Instrumentation` which
+is disabled by default. While it is disabled, each instrumented point costs
+one attribute lookup. Once enabled with ``instrumentation.enable()``, it
+records:
+
+    * for each file (or ``'<string>'``, for documents loaded from strings),
+      the number of times it was parsed (or restored from the on-disk
+      cache), and the time taken, and the time spent generating its
+      classes;
+    * for each generated class, the time taken to generate it, the number
+      of instances built, the time taken to build them (cumulative, and
+      percentiles of recent builds), the properties set, children added and
+      signals connected while doing so, and the number of instances still
+      alive.
+
+It also calls any hooks added with `Instrumentation.add_hook` at the
+beginning and end of each of these phases, so that they can be forwarded to
+a tracing system::
+
+    >>> def hook(event, phase, name, seconds):
+    ...     # event is 'begin' or 'end', phase is one of 'parse',
+    ...     # 'generate', 'build' and 'connect', name is the file name or
+    ...     # class id, and seconds is the time taken (None on 'begin').
+    ...     tracer.record(event, phase, name, seconds)
+    >>> instrumentation.add_hook(hook)
+    >>> instrumentation.enable()
+
+Hooks are called from the thread doing the work. For `from_filename_async`,
+that is the calling thread, and the parse phase only covers what is done
+there (resolving classes and converting values), not the reading and
+parsing done beforehand in a worker thread.
+
+Properties set and children added are counted from the instantiation plan
+(see `_plan`), so they cover the objects built along with an instance, but
+not those of deferred subtrees built later.
+"""
+from . import _plan
+
+import collections
+import time
+import weakref
+
+# The number of recent build times kept for each class, from which the
+# percentiles are computed.
+SAMPLES = 1024
+
+PERCENTILES = (50, 90, 99)
+
+
+class _ClassStats(object):
+
+    __slots__ = ('generate_time', 'instances', 'live', 'build_time',
+                 'samples', 'properties', 'children', 'signals', 'plan',
+                 'plan_counts')
+
+    def __init__(self):
+        self.generate_time = 0.0
+        self.instances = 0
+        self.live = 0
+        self.build_time = 0.0
+        self.samples = collections.deque(maxlen=SAMPLES)
+        self.properties = 0
+        self.children = 0
+        self.signals = 0
+        self.plan = None
+        self.plan_counts = (0, 0)
+
+    def counts(self, plan, cls):
+        """Return the properties set and children added by `plan`.
+
+        `cls` is the class of the object being instantiated.
+        """
+        if plan is not self.plan:
+            self.plan = plan
+            self.plan_counts = _plan_counts(plan, cls)
+        return self.plan_counts
+
+    def to_dict(self):
+        result = {
+            'generate_time': self.generate_time,
+            'instances': self.instances,
+            'live': self.live,
+            'build_time': self.build_time,
+            'properties': self.properties,
+            'children': self.children,
+            'signals': self.signals,
+        }
+        samples = sorted(self.samples)
+        for percentile in PERCENTILES:
+            key = 'build_p%d' % percentile
+            if samples:
+                index = min(len(samples) - 1,
+                            len(samples) * percentile // 100)
+                result[key] = samples[index]
+            else:
+                result[key] = None
+        return result
+
+
+def _plan_counts(plan, cls):
+    properties = len(cls._construct_properties)
+    children = 0
+    for step in plan.steps:
+        op = step[0]
+        if op == _plan.CREATE:
+            properties += len(step[2]._construct_properties)
+        elif op in (_plan.SET, _plan.SET_REFERENCE, _plan.SET_IMAGE,
+                    _plan.CHILD_SET, _plan.CHILD_SET_REFERENCE):
+            properties += 1
+        elif op == _plan.ADD:
+            children += 1
+    return properties, children
+
+
+class Instrumentation(object):
+    """Statistics and hooks for loading and instantiation.
+
+    See the module docstring. `class_stats` and `file_stats` return the
+    statistics recorded since the last `clear`.
+    """
+
+    __slots__ = ('enabled', '_hooks', '_classes', '_files')
+
+    def __init__(self):
+        self.enabled = False
+        self._hooks = []
+        self._classes = {}
+        self._files = {}
+
+    def enable(self):
+        """Start recording statistics and calling hooks."""
+        self.enabled = True
+
+    def disable(self):
+        """Stop recording statistics and calling hooks.
+
+        The statistics recorded so far are kept.
+        """
+        self.enabled = False
+
+    def add_hook(self, hook):
+        """Call ``hook(event, phase, name, seconds)`` around each phase."""
+        self._hooks.append(hook)
+
+    def remove_hook(self, hook):
+        """Stop calling `hook`."""
+        self._hooks.remove(hook)
+
+    def clear(self):
+        """Forget all of the statistics recorded so far.
+
+        Instances which are still alive are no longer counted as such.
+        """
+        self._classes = {}
+        self._files = {}
+
+    def class_stats(self):
+        """Return a dict mapping generated classes to their statistics.
+
+        Each value is a dict with the keys ``generate_time``, ``instances``,
+        ``live``, ``build_time`` (the total time taken by builds),
+        ``build_p50``, ``build_p90`` and ``build_p99`` (percentiles of the
+        time taken by recent builds, or None), ``properties``, ``children``
+        and ``signals``. Times are in seconds.
+        """
+        return dict((cls, stats.to_dict())
+                    for cls, stats in self._classes.items())
+
+    def file_stats(self):
+        """Return a dict mapping file names to their statistics.
+
+        Each value is a dict with the keys ``loads``, ``parse_time`` and
+        ``generate_time``. Times are in seconds.
+        """
+        return dict((source, dict(stats))
+                    for source, stats in self._files.items())
+
+    def _class(self, cls):
+        stats = self._classes.get(cls)
+        if stats is None:
+            stats = self._classes[cls] = _ClassStats()
+        return stats
+
+    def _file(self, source):
+        if source is None:
+            source = '<string>'
+        stats = self._files.get(source)
+        if stats is None:
+            stats = self._files[source] = {
+                'loads': 0,
+                'parse_time': 0.0,
+                'generate_time': 0.0,
+            }
+        return stats
+
+    def _call_hooks(self, event, phase, name, seconds=None):
+        for hook in self._hooks:
+            hook(event, phase, name, seconds)
+
+    def _time(self, phase, name, function, *args):
+        self._call_hooks('begin', phase, name)
+        start = time.perf_counter()
+        result = function(*args)
+        seconds = time.perf_counter() - start
+        self._call_hooks('end', phase, name, seconds)
+        return result, seconds
+
+    def parse(self, source, function, *args):
+        """Call ``function(*args)``, which loads the file `source`."""
+        name = '<string>' if source is None else source
+        result, seconds = self._time('parse', name, function, *args)
+        stats = self._file(source)
+        stats['loads'] += 1
+        stats['parse_time'] += seconds
+        return result
+
+    def generate(self, builder, ident, function):
+        """Call `function`, which generates the class `ident` of `builder`."""
+        _, seconds = self._time('generate', ident, function)
+        self._file(builder.source)['generate_time'] += seconds
+        self._class(dict.__getitem__(builder, ident)).generate_time += seconds
+
+    def build(self, plan, obj, function):
+        """Call ``function(plan, obj)``, which builds an instance."""
+        cls = type(obj)
+        result, seconds = self._time('build', cls._ident, function, plan,
+                                     obj)
+        self.built(plan, obj, seconds)
+        return result
+
+    def built(self, plan, obj, seconds=None):
+        """Record that `obj` has been built, taking `seconds`, if known."""
+        stats = self._class(type(obj))
+        properties, children = stats.counts(plan, type(obj))
+        stats.instances += 1
+        stats.properties += properties
+        stats.children += children
+        if seconds is not None:
+            stats.build_time += seconds
+            stats.samples.append(seconds)
+        stats.live += 1
+        if hasattr(obj, 'weak_ref'):
+            obj.weak_ref(_finalized, stats)
+        else:
+            weakref.finalize(obj, _finalized, stats)
+
+    def connect(self, obj, function):
+        """Call `function`, which connects the signals of `obj`'s instance.
+
+        `function` returns the number of handlers connected.
+        """
+        cls = type(obj)
+        connected, _ = self._time('connect', cls._ident, function)
+        self._class(cls).signals += connected
+
+
+def _finalized(stats):
+    stats.live -= 1
+
+
+# The instrumentation used by the whole library; see `Instrumentation`.
+instrumentation = Instrumentation()
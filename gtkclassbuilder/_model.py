@@ -0,0 +1,185 @@
+"""The ``<columns>`` and ``<data>`` of list and tree stores.
+
+A ``GtkListStore`` in a glade file may declare its column types, and rows of
+data::
+
+    <object class="GtkListStore" id="choices">
+      <columns>
+        <column type="gchararray"/>
+        <column type="gint"/>
+      </columns>
+      <data>
+        <row>
+          <col id="0">One</col>
+          <col id="1">1</col>
+        </row>
+      </data>
+    </object>
+
+`from_element` converts these once, when the class is generated (`raw` and
+`convert` are its two halves, for when the document is parsed in one thread
+and converted in another). Empty cells in columns holding objects (such as
+the ``GdkPixbuf`` icons of an icon view's model) are left unset, as
+GtkBuilder does. `prepare` turns the rows into ``GObject.Value`` objects of
+the right types, and `insert` adds them to a new store in bulk, as part of
+instantiating it (see `_plan`). `load_rows` is the public interface to the
+same bulk insertion, for rows which come from elsewhere.
+"""
+from . import _convert
+from ._check import BadInput
+from ._utils import gi_module, namespace_split
+
+# The gi namespaces and class names of column types which can't be found
+# with `namespace_split`.
+_TYPE_CLASSES = {
+    'GdkPixbuf': ('GdkPixbuf', 'Pixbuf'),
+}
+
+
+def from_element(elt):
+    """Return the columns and rows declared by the ``<object>`` `elt`.
+
+    The result is a ``(columns, rows)`` pair. `columns` is a list of type
+    names, or None if `elt` has no ``<columns>``. `rows` is a list of
+    ``(columns, values)`` pairs, giving the columns set by each row and the
+    (converted) values for them. Empty cells in object-typed columns are
+    left out.
+    """
+    return convert(*raw(elt))
+
+
+def raw(elt):
+    """Return the columns and rows of `elt`, without converting them.
+
+    Like `from_element`, but each row is a list of ``[column, text]`` pairs.
+    Raises `KeyError` or `ValueError` if a ``<column>`` or ``<col>`` is
+    missing an attribute, or has an invalid one.
+    """
+    columns_elt = elt.find('./columns')
+    if columns_elt is None:
+        return None, []
+    columns = [column.attrib['type']
+               for column in columns_elt.findall('./column')]
+    rows = [[[int(col.attrib['id']), col.text or '']
+             for col in row.findall('./col')]
+            for row in elt.findall('./data/row')]
+    return columns, rows
+
+
+def convert(columns, rows):
+    """Convert the result of `raw` to that of `from_element`."""
+    if columns is None:
+        return None, []
+    gtypes = column_types(columns)
+    GObject = gi_module('GObject')
+    objects = [GObject.type_is_a(gtype, GObject.TYPE_OBJECT)
+               for gtype in gtypes]
+    result = []
+    for row in rows:
+        indexes = []
+        values = []
+        for index, text in row:
+            if not 0 <= index < len(gtypes):
+                raise BadInput("Row has a value for column %d, but there "
+                               "are only %d columns" % (index, len(gtypes)))
+            if objects[index]:
+                if text:
+                    raise BadInput("Can't load value %r for column %d of "
+                                   "type %s" % (text, index,
+                                                gtypes[index].name))
+                continue
+            indexes.append(index)
+            values.append(_convert.convert_column(gtypes[index], text,
+                                                  index))
+        result.append((indexes, values))
+    return columns, result
+
+
+def column_types(names):
+    """Return the ``GType`` for each of the type names in `names`.
+
+    Types which haven't been registered yet (``GdkPixbuf``, say, if nothing
+    has used pixbufs) are registered by looking up their gi class.
+    """
+    GObject = gi_module('GObject')
+    result = []
+    for name in names:
+        try:
+            result.append(GObject.type_from_name(name))
+        except RuntimeError:
+            result.append(_register(name))
+    return result
+
+
+def _register(name):
+    """Return the ``GType`` called `name`, found through its gi class."""
+    try:
+        namespace, class_name = _TYPE_CLASSES.get(name) or \
+            namespace_split(name)
+        return getattr(gi_module(namespace), class_name).__gtype__
+    except (ValueError, AttributeError, ImportError):
+        raise BadInput("Unknown column type %r" % name)
+
+
+def prepare(gtypes, rows):
+    """Convert `rows`, as returned by `from_element`, for use by `insert`.
+
+    `gtypes` are the types of the model's columns.
+    """
+    GObject = gi_module('GObject')
+    return [(indexes, [GObject.Value(gtypes[index], value)
+                       for index, value in zip(indexes, values)])
+            for indexes, values in rows]
+
+
+def insert(model, rows):
+    """Append the prepared `rows` to `model`.
+
+    `rows` is an iterable of ``(columns, values)`` pairs, where `values` are
+    ``GObject.Value`` objects. Sorting is turned off, and notifications
+    frozen, until all of the rows have been added.
+    """
+    Gtk = gi_module('Gtk')
+    if isinstance(model, Gtk.TreeStore):
+        def insert_row(columns, values):
+            model.insert_with_valuesv(None, -1, columns, values)
+    else:
+        def insert_row(columns, values):
+            model.insert_with_valuesv(-1, columns, values)
+
+    model.freeze_notify()
+    sort_column, order = model.get_sort_column_id()
+    if sort_column is not None:
+        model.set_sort_column_id(Gtk.TREE_SORTABLE_UNSORTED_SORT_COLUMN_ID,
+                                 order)
+    try:
+        for columns, values in rows:
+            insert_row(columns, values)
+    finally:
+        if sort_column is not None:
+            model.set_sort_column_id(sort_column, order)
+        model.thaw_notify()
+
+
+def load_rows(model, rows, columns=None):
+    """Append `rows` to the ``Gtk.ListStore`` or ``Gtk.TreeStore`` `model`.
+
+    Each row is a sequence of values for `columns`, a list of column
+    numbers (all of the model's columns, in order, by default). `rows` may
+    also be a two-dimensional array with a ``tolist`` method, such as a
+    numpy array. The rows are added to the top level of a tree store.
+
+    This is much faster than calling ``model.append`` for each row, in
+    particular for sorted models. Views of the model still hear about every
+    row, so for very large loads it is worth detaching the model from its
+    views (``view.set_model(None)``) first.
+    """
+    if hasattr(rows, 'tolist'):
+        rows = rows.tolist()
+    if columns is None:
+        columns = list(range(model.get_n_columns()))
+    gtypes = [model.get_column_type(column) for column in columns]
+    GObject = gi_module('GObject')
+    insert(model, ((columns, [GObject.Value(gtype, value)
+                              for gtype, value in zip(gtypes, row)])
+                   for row in rows))
@@ -0,0 +1,419 @@
+"""Flat instantiation plans for generated classes.
+
+Instantiating a generated class creates the whole tree of objects beneath
+it, plus any objects it refers to. Rather than walk the glade structure
+every time, `compile` flattens it (once per class) into a `Plan`: a list of
+simple steps which refer to the objects being created by integer slot.
+`execute` then runs the steps in a single loop.
+
+Each step is a tuple whose first element is one of the opcodes below:
+
+    * ``(CREATE, slot, cls)`` creates an instance of the generated class
+      `cls`, passing it its construct properties.
+    * ``(CREATE_PLACEHOLDER, slot, cls, kwargs)`` creates the placeholder
+      for a deferred subtree, by calling ``cls(**kwargs)``.
+    * ``(SET, slot, key, value)`` sets a property.
+    * ``(SET_REFERENCE, slot, key, target)`` sets a property to the object
+      in slot `target`.
+    * ``(ADD, slot, child)`` adds the object in slot `child` to the container
+      in slot `slot`.
+    * ``(CHILD_SET, slot, child, key, value)`` sets a child property.
+    * ``(CHILD_SET_REFERENCE, slot, child, key, target)`` sets a child
+      property to the object in slot `target`.
+    * ``(GET_SHARED, slot, cls)`` puts the shared instance of the generated
+      class `cls` in `slot` (see the ``shared`` option of `Builder`).
+    * ``(SET_IMAGE, slot, key, image)`` sets a property to the shared copy
+      of an image (see `_images.Image.apply`).
+    * ``(SET_COLUMNS, slot, types)`` sets the column types of a list or tree
+      store.
+    * ``(LOAD_ROWS, slot, rows)`` adds the rows declared in the glade file
+      to a store (see `_model.insert`).
+    * ``(FREEZE, slots)`` and ``(THAW, slots)`` call ``freeze_notify`` and
+      ``thaw_notify`` on the objects in each of `slots`.
+
+Slot 0 always holds the object being instantiated, which is created by the
+caller. All objects are created first, then their properties are set, and
+finally children are added to their containers, deepest first. Since the
+object being instantiated has no parent yet, every container is complete
+before it is attached to anything which could be realized.
+
+Unless the builder's ``freeze_notify`` option is False, the objects'
+``notify`` signals are frozen while their properties are set and children
+added, and thawed once at the end, so that each property which changed is
+notified once, after the whole tree has been built. `NotifyCounter` counts
+the notifications emitted, to measure this.
+
+A plan also records the signals of every object it creates, for use by
+``connect_signals``, and a list of steps which restore all of the properties
+declared in the glade file, for use by `reset`.
+
+The children of containers for which ``Builder._defers_children`` is true
+are not part of the plan. Instead, a placeholder is added to the container
+in their place, and each child gets a `Deferred` plan of its own, which
+`execute_deferred` runs when the child is needed.
+"""
+from . import _images, _model
+from ._utils import gi_module
+
+CREATE = 0
+SET = 1
+SET_REFERENCE = 2
+ADD = 3
+CHILD_SET = 4
+CHILD_SET_REFERENCE = 5
+CREATE_PLACEHOLDER = 6
+FREEZE = 7
+THAW = 8
+GET_SHARED = 9
+SET_COLUMNS = 10
+LOAD_ROWS = 11
+SET_IMAGE = 12
+
+# The NotifyCounters which are active.
+_counters = []
+
+
+class Plan(object):
+    """The compiled form of a generated class.
+
+    `steps` is the list of steps, as described in the module docstring.
+    `names` is a list mapping slot numbers to ids (placeholders are named
+    ``('placeholder', id)``, where `id` is that of the deferred child).
+    `signals` is a list of ``(handler_name, connections)`` pairs, where
+    `connections` is a list of ``(slot, signal_name)`` pairs to connect to
+    that handler. `resets` is a list of steps which set every property and
+    child property declared in the glade file back to its declared value.
+    `deferred` is a list of `Deferred` subtrees. `externals` is a list of
+    ``(slot, id)`` pairs for objects which the plan uses, but which are
+    created by some other plan. `owned` lists the slots of the objects
+    which the plan creates itself; the others are externals, or shared
+    objects.
+
+    An instance stores all of its objects, including those in deferred
+    subtrees, in a single list. `instance_slots` maps each of the plan's
+    slots to an index in that list. The plan of a generated class (as
+    opposed to that of a deferred subtree) also has an `index`, mapping ids
+    to indices in the list, and `owners`, which maps the indices of objects
+    in deferred subtrees to ``(deferred, placeholder)`` pairs, where
+    `deferred` is the innermost `Deferred` creating the object, and
+    `placeholder` is the index of its placeholder. Both are None for the
+    plans of deferred subtrees.
+
+    `template` is True if instances are built from a composite template
+    (see `_template`) rather than by running `steps`.
+    """
+
+    __slots__ = ('steps', 'names', 'signals', 'resets', 'deferred',
+                 'externals', 'owned', 'instance_slots', 'index', 'owners',
+                 'template')
+
+    def __init__(self, steps, names, signals, resets, deferred=(),
+                 externals=(), owned=None):
+        self.steps = steps
+        self.names = names
+        self.signals = signals
+        self.resets = resets
+        self.deferred = deferred
+        self.externals = externals
+        if owned is None:
+            owned = list(range(len(names)))
+        self.owned = owned
+        self.instance_slots = list(range(len(names)))
+        self.index = None
+        self.owners = None
+        self.template = False
+
+
+class Deferred(object):
+    """A subtree whose construction is deferred until it is needed.
+
+    `ident` is the id of the root of the subtree, `cls` its class, `slot`
+    the slot of its placeholder in the enclosing plan, and `plan` the `Plan`
+    which builds it.
+    """
+
+    __slots__ = ('ident', 'cls', 'slot', 'plan')
+
+    def __init__(self, ident, cls, slot, plan):
+        self.ident = ident
+        self.cls = cls
+        self.slot = slot
+        self.plan = plan
+
+
+def compile(builder, ident):
+    """Compile a `Plan` for instantiating the class `ident` in `builder`."""
+    plan = _compile(builder, ident, frozenset())
+    _index(plan)
+    return plan
+
+
+def _compile(builder, ident, external):
+    """Compile the plan for `ident`, without indexing it.
+
+    `external` is a set of ids which will already have been created by the
+    time the plan is run; see `execute_deferred`.
+    """
+    slots = {}
+    names = []
+    creates = []
+    sets = []
+    adds = []
+    signals = {}
+    resets = []
+    externals = []
+    shared = []
+    lazy_children = []
+
+    def new_slot(name):
+        slots[name] = len(names)
+        names.append(name)
+        return slots[name]
+
+    def visit(ident, reference=False):
+        if ident in slots:
+            return slots[ident]
+        slot = new_slot(ident)
+        if ident in external:
+            externals.append((slot, ident))
+            return slot
+        cls = builder[ident]
+        if reference and builder._shares(ident):
+            creates.append((GET_SHARED, slot, cls))
+            shared.append(slot)
+            return slot
+        if slot != 0:
+            creates.append((CREATE, slot, cls))
+        for signal, handler_name in cls._signals.items():
+            signals.setdefault(handler_name, []).append((slot, signal))
+        if cls._column_types is not None:
+            sets.append((SET_COLUMNS, slot, cls._column_types))
+        for prop in cls._properties:
+            if prop.reference:
+                step = (SET_REFERENCE, slot, prop.key,
+                        visit(prop.value, True))
+            elif isinstance(prop.value, _images.Image):
+                step = (SET_IMAGE, slot, prop.key,
+                        prop.value.resolve(builder.directory))
+            else:
+                step = (SET, slot, prop.key, prop.value)
+            resets.append(step)
+            if prop in cls._instance_properties:
+                sets.append(step)
+        if cls._prepared_rows:
+            sets.append((LOAD_ROWS, slot, cls._prepared_rows))
+        lazy = builder._defers_children(cls)
+        for child_ident in cls._children:
+            if lazy:
+                child = new_slot(('placeholder', child_ident))
+                creates.append((CREATE_PLACEHOLDER, child, _placeholder(),
+                                {'visible': _visible(builder[child_ident])}))
+                lazy_children.append((child_ident, child))
+            else:
+                child = visit(child_ident)
+            adds.append((ADD, slot, child))
+            for prop in builder[child_ident]._child_properties:
+                if prop.reference:
+                    step = (CHILD_SET_REFERENCE, slot, child, prop.key,
+                            visit(prop.value, True))
+                else:
+                    step = (CHILD_SET, slot, child, prop.key, prop.value)
+                adds.append(step)
+                resets.append(step)
+        return slot
+
+    visit(ident)
+
+    # The deferred subtrees are compiled last, so that they know which
+    # objects the enclosing plan (or the plans enclosing it) creates.
+    available = external.union(name for name in names
+                               if not isinstance(name, tuple))
+    deferred = [Deferred(child_ident, builder[child_ident], slot,
+                         _compile(builder, child_ident, available))
+                for child_ident, slot in lazy_children]
+    not_owned = set(slot for slot, _ in externals).union(shared)
+    owned = [slot for slot in range(len(names)) if slot not in not_owned]
+    steps = creates + sets + adds
+    if builder.freeze_notify:
+        thawed = list(reversed(owned))
+        steps = creates + [(FREEZE, owned)] + sets + adds + \
+            [(THAW, thawed)]
+        resets = [(FREEZE, owned)] + resets + [(THAW, thawed)]
+    return Plan(steps, names, sorted(signals.items()), resets, deferred,
+                externals, owned)
+
+
+def _index(plan):
+    """Fill in the `instance_slots`, `index` and `owners` of `plan`."""
+    index = {}
+    owners = {}
+
+    def assign(subplan, owner):
+        subplan.instance_slots = []
+        for name in subplan.names:
+            if name not in index:
+                index[name] = len(index)
+                if owner is not None:
+                    owners[index[name]] = owner
+            subplan.instance_slots.append(index[name])
+        for deferred in subplan.deferred:
+            placeholder = subplan.instance_slots[deferred.slot]
+            assign(deferred.plan, (deferred, placeholder))
+
+    assign(plan, None)
+    plan.index = index
+    plan.owners = owners
+
+
+def _placeholder():
+    """Return the class used for the placeholders of deferred subtrees."""
+    return gi_module('Gtk').Box
+
+
+def _visible(cls):
+    """Return the declared value of the ``visible`` property of `cls`."""
+    for prop in cls._properties:
+        if prop.key == 'visible':
+            return prop.value
+    return False
+
+
+def execute(plan, root):
+    """Run `plan`, with `root` as the object in slot 0.
+
+    Returns a list of the objects created, indexed by slot.
+    """
+    objects = [None] * len(plan.names)
+    objects[0] = root
+    if _counters:
+        _watch(root)
+    _run(plan.steps, objects)
+    return objects
+
+
+def execute_steps(plan, objects):
+    """Run `plan` one step at a time.
+
+    This is a generator, which yields after each step. `objects` must be a
+    list with an entry for each slot, and the object being instantiated in
+    slot 0; the other slots are filled in as the plan runs.
+    """
+    if _counters:
+        _watch(objects[0])
+    for step in plan.steps:
+        _run((step,), objects)
+        yield
+
+
+def execute_deferred(deferred, placeholder, available):
+    """Build the `Deferred` subtree `deferred` into `placeholder`.
+
+    `available` is the list of the instance's objects (see `Plan`), which
+    provide the plan's externals. Returns a list of the objects in the
+    subtree, indexed by slot.
+    """
+    cls = deferred.cls
+    root = cls.__new__(cls)
+    cls._parent_class.__init__(root, **cls._construct_properties)
+    if _counters:
+        _watch(root)
+    objects = [None] * len(deferred.plan.names)
+    objects[0] = root
+    for slot, _ in deferred.plan.externals:
+        objects[slot] = available[deferred.plan.instance_slots[slot]]
+    _run(deferred.plan.steps, objects)
+    placeholder.pack_start(root, True, True, 0)
+    return objects
+
+
+def reset(plan, objects):
+    """Restore the declared properties of `objects`.
+
+    `objects` is a list of objects, indexed by slot, as returned by `execute`.
+    """
+    _run(plan.resets, objects)
+
+
+def _run(steps, objects):
+    for step in steps:
+        op = step[0]
+        if op == SET:
+            objects[step[1]].set_property(step[2], step[3])
+        elif op == CREATE:
+            cls = step[2]
+            obj = cls.__new__(cls)
+            cls._parent_class.__init__(obj, **cls._construct_properties)
+            objects[step[1]] = obj
+            if _counters:
+                _watch(obj)
+        elif op == ADD:
+            objects[step[1]].add(objects[step[2]])
+        elif op == CHILD_SET:
+            objects[step[1]].child_set_property(objects[step[2]],
+                                                step[3], step[4])
+        elif op == SET_REFERENCE:
+            objects[step[1]].set_property(step[2], objects[step[3]])
+        elif op == CHILD_SET_REFERENCE:
+            objects[step[1]].child_set_property(objects[step[2]],
+                                                step[3], objects[step[4]])
+        elif op == CREATE_PLACEHOLDER:
+            objects[step[1]] = step[2](**step[3])
+            if _counters:
+                _watch(objects[step[1]])
+        elif op == GET_SHARED:
+            objects[step[1]] = step[2]._shared_instance()
+        elif op == SET_IMAGE:
+            step[3].apply(objects[step[1]], step[2])
+        elif op == SET_COLUMNS:
+            objects[step[1]].set_column_types(step[2])
+        elif op == LOAD_ROWS:
+            _model.insert(objects[step[1]], step[2])
+        elif op == FREEZE:
+            for slot in step[1]:
+                objects[slot].freeze_notify()
+        elif op == THAW:
+            for slot in step[1]:
+                objects[slot].thaw_notify()
+
+
+class NotifyCounter(object):
+    """Counts the ``notify`` signals of objects created by generated classes.
+
+    While the counter is active (inside a ``with`` block), every object
+    created by instantiating a generated class is watched, and `count` is
+    the number of ``notify`` signals they have emitted so far::
+
+        >>> with NotifyCounter() as counter:
+        ...     window = MainWindow()
+        >>> counter.count
+
+    Watching objects is not free, so this is only meant for tests and
+    profiling.
+    """
+
+    __slots__ = ('count', '_handler_ids')
+
+    def __init__(self):
+        self.count = 0
+        self._handler_ids = []
+
+    def __enter__(self):
+        _counters.append(self)
+        return self
+
+    def __exit__(self, *exc_info):
+        _counters.remove(self)
+        for obj, handler_id in self._handler_ids:
+            obj.disconnect(handler_id)
+        self._handler_ids = []
+
+
+def _watch(obj):
+    """Have every active `NotifyCounter` count the notifications of `obj`."""
+    for counter in _counters:
+        counter._handler_ids.append(
+            (obj, obj.connect('notify', _on_notify, counter)))
+
+
+def _on_notify(obj, pspec, counter):
+    counter.count += 1
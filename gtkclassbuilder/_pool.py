@@ -0,0 +1,96 @@
+"""Pools of recycled instances of generated classes.
+
+See `BuiltObject.pool`.
+"""
+import collections
+
+
+class Pool(object):
+    """A pool of reusable instances of the generated class `cls`.
+
+    `acquire` hands out an idle instance if there is one, and creates a new
+    one otherwise. `release` returns an instance to the pool: the properties
+    declared in the glade file are restored, and the handlers connected by
+    ``connect_signals`` are disconnected. At most `max_size` idle instances
+    are kept; when there are more, the ones released longest ago are
+    evicted (and destroyed).
+
+    Only state described by the glade file is reset. Changes made by other
+    means (properties not mentioned in the glade file, handlers connected
+    directly with ``connect``, text typed into an entry's buffer...) are
+    the caller's responsibility.
+    """
+
+    __slots__ = ('cls', 'max_size', '_idle', '_stats')
+
+    def __init__(self, cls, max_size):
+        self.cls = cls
+        self.max_size = max_size
+        self._idle = collections.deque()
+        self._stats = {
+            'hits': 0,
+            'misses': 0,
+            'releases': 0,
+            'evictions': 0,
+            'added': 0,
+        }
+
+    def acquire(self, *args, **kwargs):
+        """Return an instance of the pool's class.
+
+        If a new instance needs to be created, `args` and `kwargs` are passed
+        to the class's constructor.
+        """
+        if self._idle:
+            self._stats['hits'] += 1
+            return self._idle.pop()
+        self._stats['misses'] += 1
+        return self.cls(*args, **kwargs)
+
+    def release(self, obj):
+        """Return `obj`, which was handed out by `acquire`, to the pool."""
+        self._stats['releases'] += 1
+        obj._recycle()
+        self._idle.append(obj)
+        self._trim()
+
+    def add(self, obj):
+        """Add the newly created instance `obj` to the pool.
+
+        Unlike `release`, this does not reset `obj`; it is used to stock the
+        pool ahead of time (see `Builder.prebuild`).
+        """
+        self._stats['added'] += 1
+        self._idle.append(obj)
+        self._trim()
+
+    def resize(self, max_size):
+        """Change the maximum number of idle instances kept by the pool."""
+        self.max_size = max_size
+        self._trim()
+
+    def clear(self):
+        """Evict all idle instances."""
+        self.resize(0)
+
+    def stats(self):
+        """Return a dict of counters describing the use of the pool.
+
+        The keys are ``hits`` (instances reused by `acquire`), ``misses``
+        (instances created by `acquire`), ``releases``, ``evictions``,
+        ``added`` (instances stocked with `add`) and ``idle``, the number of
+        instances currently in the pool.
+        """
+        result = dict(self._stats)
+        result['idle'] = len(self._idle)
+        return result
+
+    def __len__(self):
+        return len(self._idle)
+
+    def _trim(self):
+        while len(self._idle) > self.max_size:
+            obj = self._idle.popleft()
+            self._stats['evictions'] += 1
+            if hasattr(obj, 'destroy'):
+                obj.destroy()
@@ -0,0 +1,73 @@
+"""Building instances in the background, while the main loop is idle.
+
+See `Builder.prebuild`.
+"""
+from ._utils import gi_module
+
+import time
+
+
+class Prebuild(object):
+    """Builds `count` instances of the generated class `cls` when idle.
+
+    The instances are built in slices, from a ``GLib.idle_add`` source with
+    the given `priority` (``GLib.PRIORITY_LOW`` if None). Each slice runs
+    steps of the instantiation plan until `budget` seconds have passed, so
+    that the main loop is never blocked for much longer than that. Finished
+    instances are added to the class's pool (see `BuiltObject.pool`).
+    """
+
+    __slots__ = ('cls', 'remaining', 'budget', '_steps', '_pool', '_source_id')
+
+    def __init__(self, cls, count, budget, priority):
+        self.cls = cls
+        self.remaining = count
+        self.budget = budget
+        self._steps = None
+        pool = cls.pool()
+        if pool.max_size < len(pool) + count:
+            pool.resize(len(pool) + count)
+        self._pool = pool
+        GLib = gi_module('GLib')
+        if priority is None:
+            priority = GLib.PRIORITY_LOW
+        self._source_id = GLib.idle_add(self._slice, priority=priority)
+
+    @property
+    def done(self):
+        """Whether all of the instances have been built (or cancelled)."""
+        return self._source_id is None
+
+    def cancel(self):
+        """Stop building instances. Those already built stay in the pool."""
+        if self._source_id is not None:
+            gi_module('GLib').source_remove(self._source_id)
+            self._finish()
+
+    def _finish(self):
+        self._source_id = None
+        self._steps = None
+
+    def _slice(self):
+        try:
+            return self._run_slice()
+        except Exception:
+            # GLib removes a source whose callback raises, so nothing more
+            # will be built; the exception itself is printed by PyGObject.
+            self._finish()
+            raise
+
+    def _run_slice(self):
+        deadline = time.monotonic() + self.budget
+        while time.monotonic() < deadline:
+            if self._steps is None:
+                if self.remaining == 0:
+                    self._finish()
+                    return False
+                self._steps = self.cls._construct_steps()
+            obj = next(self._steps)
+            if obj is not None:
+                self._pool.add(obj)
+                self._steps = None
+                self.remaining -= 1
+        return True
@@ -0,0 +1,106 @@
+"""A process-wide registry of the builders generated from each document.
+
+See `Registry`. The registry used by `from_string` and `from_filename` is
+``gtkclassbuilder.registry``.
+"""
+import collections
+import hashlib
+
+
+class Registry(object):
+    """A bounded cache of `Builder` objects, keyed by document and options.
+
+    Loading the same glade document twice (with the same keyword arguments
+    for `Builder`) returns the same builder, and therefore the same classes,
+    rather than generating new ones. At most `max_size` builders are kept;
+    when there are more, the ones used longest ago are evicted. A
+    `max_size` of 0 disables the registry.
+
+    Documents are compared after normalizing line endings and surrounding
+    whitespace, and encoding them as UTF-8; otherwise they must be identical.
+    The ``source`` option, which only names the document for statistics,
+    is not compared. As a result, a document loaded under several names
+    gets the builder (and the name) of the first load, and its statistics
+    are all recorded under that name (see `_instrument`).
+
+    The builders are shared, so callers must not modify them (or their
+    classes) in ways that other users of the same document would not expect.
+    """
+
+    __slots__ = ('max_size', '_entries', '_stats')
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._entries = collections.OrderedDict()
+        self._stats = {
+            'hits': 0,
+            'misses': 0,
+            'evictions': 0,
+        }
+
+    def get(self, contents, options, build):
+        """Return the builder for the document `contents`.
+
+        `contents` is the text of the document, as bytes or str, and
+        `options` the keyword arguments it is loaded with. If the registry
+        has no such builder, `build` is called to create it.
+        """
+        if self.max_size == 0:
+            return build()
+        key = _key(contents, options)
+        result = self._entries.get(key)
+        if result is not None:
+            self._stats['hits'] += 1
+            self._entries.move_to_end(key)
+            return result
+        self._stats['misses'] += 1
+        result = build()
+        self._entries[key] = result
+        self._trim()
+        return result
+
+    def resize(self, max_size):
+        """Change the maximum number of builders kept by the registry."""
+        self.max_size = max_size
+        self._trim()
+
+    def clear(self):
+        """Forget all of the builders in the registry."""
+        self._entries.clear()
+
+    def stats(self):
+        """Return a dict of counters describing the use of the registry.
+
+        The keys are ``hits``, ``misses``, ``evictions``, ``size`` (the
+        number of builders currently in the registry) and ``max_size``.
+        """
+        result = dict(self._stats)
+        result['size'] = len(self._entries)
+        result['max_size'] = self.max_size
+        return result
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _trim(self):
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self._stats['evictions'] += 1
+
+
+def _key(contents, options):
+    if not isinstance(contents, bytes):
+        contents = contents.encode('utf-8')
+    contents = contents.replace(b'\r\n', b'\n').strip()
+    digest = hashlib.sha256(contents)
+    normalized = []
+    for name, value in sorted(options.items()):
+        if name == 'source':
+            # The builder keeps the source it was first loaded with, so
+            # later loads under other names are counted against that one.
+            continue
+        if isinstance(value, (set, frozenset, list, tuple)):
+            value = sorted(value)
+        normalized.append((name, value))
+    digest.update(('\0%r' % normalized).encode('utf-8'))
+    return digest.hexdigest()
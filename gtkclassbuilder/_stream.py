@@ -0,0 +1,319 @@
+"""Loading glade files in a single streaming pass.
+
+`load` reads a glade file with expat, validating each element and
+extracting what it describes as soon as the element is complete, and then
+discarding it. Unlike parsing the whole file and then walking the tree (as
+`Builder._from_root` does), the document is never held in memory as a
+whole tree, only the text of the properties the builder needs.
+
+Loading is done in two halves. `parse` does the reading, checking and
+extracting. It returns records in the style of the on-disk cache's (see
+`Builder._to_records`), but holding text as it appears in the document, and
+glade class and type names. `declare` then resolves the classes and
+``GParamSpec`` objects, converts the values, and declares the classes in a
+`Builder`. `from_filename_async` runs the halves in different threads.
+
+The checks are those of `_check`, applied by a `_check.Validator` as each
+element is opened and closed. Problems found while converting properties
+and list store contents are added to the same report, so a bad file raises
+a single `BadInput` listing every error in it, with line numbers. Classes
+are still generated lazily, by the `Builder` they are declared in.
+"""
+from . import _check, _convert, _model
+from ._utils import gi_class
+from .builder import Property
+import functools
+import xml.etree.ElementTree as ET
+from xml.parsers import expat
+
+# The number of bytes read from the file at a time.
+_CHUNK_SIZE = 64 * 1024
+
+
+class _Frame(object):
+    """What `parse` knows about an ``<object>`` element it is inside of.
+
+    `record` is the object's record (see `parse`), or None for internal
+    children, and everything beneath them, which are checked but not added
+    to the builder (see `_child_elements` in `.builder`). `lines` maps the
+    ``<property>`` elements of the object, and of the ``<packing>`` elements
+    of its children, to their line numbers.
+    """
+
+    __slots__ = ('record', 'lines')
+
+    def __init__(self, record):
+        self.record = record
+        self.lines = {}
+
+
+class _Loader(object):
+    """The handlers which expat calls as it parses a document for `parse`.
+
+    `records` lists the records of the declared objects, in document order.
+    """
+
+    __slots__ = ('records', 'report', 'validator', 'parser', 'tree', 'path',
+                 'frames', 'child_frames')
+
+    def __init__(self, parser, trusted):
+        self.records = []
+        self.report = _check.Report()
+        self.validator = None if trusted else _check.Validator(self.report)
+        self.parser = parser
+        self.tree = ET.TreeBuilder()
+        self.path = []
+        self.frames = {}
+        # Maps each <child> element to the frame of its object, once the
+        # object is complete.
+        self.child_frames = {}
+
+    def start(self, tag, attrib):
+        line = self.parser.CurrentLineNumber
+        elt = self.tree.start(tag, attrib)
+        path = self.path
+        path.append(elt)
+        ok = self.validator is None or self.validator.start(elt, line)
+        if not ok or len(path) == 1:
+            return
+        frames = self.frames
+        if tag == 'object' and _is_object(path, frames):
+            record = None
+            if len(path) == 2:
+                record = _record(attrib, line, None)
+            else:
+                container = frames[path[-3]].record
+                if container is not None and \
+                        'internal-child' not in path[-2].attrib:
+                    record = _record(attrib, line, container['class'])
+            if record is not None:
+                self.records.append(record)
+            frames[elt] = _Frame(record)
+        elif tag == 'property':
+            frame = frames.get(path[-2])
+            if frame is None and len(path) >= 4 and \
+                    path[-2].tag == 'packing':
+                frame = frames.get(path[-4])
+            if frame is not None:
+                frame.lines[elt] = line
+
+    def data(self, text):
+        self.tree.data(text)
+
+    def end(self, tag):
+        elt = self.tree.end(tag)
+        if self.validator is not None:
+            self.validator.end(elt)
+        path = self.path
+        path.pop()
+        if not path:
+            return
+        parent = path[-1]
+        frames = self.frames
+        if elt in frames:
+            frame = frames.pop(elt)
+            self._end_object(elt, frame)
+            if parent.tag == 'child':
+                self.child_frames[parent] = frame
+        elif elt.tag == 'child' and parent in frames:
+            frame = self.child_frames.pop(elt, None)
+            if frame is not None:
+                self._end_child(elt, frames[parent], frame)
+            parent.remove(elt)
+        if len(path) == 1:
+            parent.remove(elt)
+
+    def _end_object(self, elt, frame):
+        # The <child> elements have already been checked and removed.
+        record = frame.record
+        if record is None:
+            return
+        for xml_child in elt.findall('./property'):
+            prop = _property(xml_child, frame)
+            if prop is not None:
+                record['properties'].append(prop)
+        for xml_child in elt.findall('./signal'):
+            if 'name' in xml_child.attrib and 'handler' in xml_child.attrib:
+                record['signals'][xml_child.attrib['name']] = \
+                    xml_child.attrib['handler']
+        try:
+            record['columns'], record['rows'] = _model.raw(elt)
+        except (KeyError, ValueError):
+            # A <column> or <col> with a missing or invalid attribute, which
+            # has already been reported.
+            pass
+
+    def _end_child(self, elt, container, frame):
+        if frame.record is None:
+            return
+        container.record['children'].append(frame.record['id'])
+        packing = elt.find('./packing')
+        if packing is not None:
+            for xml_child in packing.findall('./property'):
+                prop = _property(xml_child, container)
+                if prop is not None:
+                    frame.record['child_properties'].append(prop)
+
+
+def _record(attrib, line, container):
+    """Return a new record for the ``<object>`` with attributes `attrib`.
+
+    `container` is the class name of the object's container, if any.
+    """
+    return {
+        'id': attrib['id'],
+        'class': attrib['class'],
+        'line': line,
+        'container': container,
+        'properties': [],
+        'signals': {},
+        'children': [],
+        'child_properties': [],
+        'columns': None,
+        'rows': [],
+    }
+
+
+def _property(elt, frame):
+    """Return the ``[name, text, line]`` of the ``<property>`` `elt`.
+
+    `frame` is the frame which recorded the line of `elt`. Returns None if
+    `elt` has no name (which has already been reported).
+    """
+    line = frame.lines.pop(elt, None)
+    if 'name' not in elt.attrib:
+        return None
+    return [elt.attrib['name'], elt.text, line]
+
+
+def load(source, builder, trusted=False):
+    """Declare the classes described by the glade file `source` in `builder`.
+
+    `source` is a filename or a binary file object. If `trusted` is True,
+    the document is not validated; this is for documents which are known to
+    be valid (see `_check.validated`). Errors converting values are still
+    reported.
+    """
+    declare(parse(source, trusted), builder)
+
+
+def parse(source, trusted=False):
+    """Read the glade file `source`, without converting anything.
+
+    `source` and `trusted` are as for `load`; `source` may also be a text
+    file object, in which case any encoding declared by the document is
+    ignored. Returns a ``(records,
+    report)`` pair, to be passed to `declare`. `records` has a dict for each
+    object to declare, in document order, with the keys of the records of
+    `Builder._to_records`, but holding the ``class`` attribute of the
+    object; a ``[name, text, line]`` list for each property and child
+    property; and the rows returned by `_model.raw`. Each record also has
+    the ``line`` of the object, and the class name of its ``container``
+    (None at the top level).
+
+    `report` holds the problems found so far; they are raised by `declare`,
+    along with those found converting values.
+    """
+    if isinstance(source, str):
+        with open(source, 'rb') as f:
+            return parse(f, trusted)
+    parser = expat.ParserCreate()
+    parser.buffer_text = True
+    loader = _Loader(parser, trusted)
+    parser.StartElementHandler = loader.start
+    parser.EndElementHandler = loader.end
+    parser.CharacterDataHandler = loader.data
+    try:
+        while True:
+            data = source.read(_CHUNK_SIZE)
+            parser.Parse(data, not data)
+            if not data:
+                break
+    except expat.ExpatError as e:
+        error = ET.ParseError('%s: line %d, column %d' %
+                              (expat.ErrorString(e.code), e.lineno,
+                               e.offset))
+        error.code = e.code
+        error.position = (e.lineno, e.offset)
+        raise error
+    return loader.records, loader.report
+
+
+def declare(parsed, builder):
+    """Declare the classes in `parsed`, as returned by `parse`, in `builder`.
+
+    Raises `BadInput` if any problems were found, while parsing or while
+    converting values.
+    """
+    records, report = parsed
+    for record in records:
+        try:
+            cls = gi_class(record['class'])
+        except (AttributeError, ValueError):
+            # ValueError is raised for names without a namespace, such as
+            # "Gtkwindow".
+            report.error(record['line'], "Unknown class %r", record['class'])
+            continue
+        container = _container_class(record['container'])
+        definition = {
+            'parent_class': cls,
+            'properties': _convert_properties(
+                report, record['properties'], _convert.find_property, cls),
+            'signals': record['signals'],
+            'children': record['children'],
+            'child_properties': _convert_properties(
+                report, record['child_properties'],
+                _convert.find_child_property, container),
+            'columns': None,
+            'rows': [],
+        }
+        try:
+            definition['columns'], definition['rows'] = _model.convert(
+                record['columns'], record['rows'])
+        except _check.BadInput as e:
+            report.error(record['line'], '%s', e)
+        builder._declare(record['id'], functools.partial(dict, definition),
+                         child=record['container'] is not None)
+    report.finish()
+
+
+def _container_class(name):
+    """Return the class called `name`, or None if there is no such class.
+
+    Unknown classes are reported along with the object they belong to.
+    """
+    if name is None:
+        return None
+    try:
+        return gi_class(name)
+    except (AttributeError, ValueError):
+        return None
+
+
+def _convert_properties(report, properties, find, cls):
+    """Convert `properties`, a list of ``[name, text, line]`` lists.
+
+    `find` looks up the ``GParamSpec`` of each property in `cls`. Returns a
+    list of the `Property` objects which could be converted, after
+    reporting the others.
+    """
+    result = []
+    for key, text, line in properties:
+        try:
+            result.append(Property.from_text(key, text, find(cls, key)))
+        except _check.BadInput as e:
+            report.error(line, '%s', e)
+    return result
+
+
+def _is_object(path, frames):
+    """Return whether to process the ``<object>`` element at the end of `path`.
+
+    That is, whether it is a child of the ``<interface>`` element, or of a
+    ``<child>`` element of another object; other ``<object>`` elements are
+    ignored, as they are on the tree path.
+    """
+    if len(path) == 2:
+        return True
+    return path[-2].tag == 'child' and path[-3] in frames and \
+        path[-2][0] is path[-1]
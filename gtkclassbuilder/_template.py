@@ -0,0 +1,142 @@
+"""Building instances with GTK's composite templates.
+
+With ``backend='template'`` (see `Builder`), each generated widget class
+whose tree can be expressed as a composite template gets one, registered
+with ``Gtk.Widget.set_template`` when the class is generated, before it has
+any instances (see `Builder._install_template`).
+Every instance after that is built by a single ``init_template`` call, which
+creates, configures and packs the whole tree in GTK's own code, rather than
+one step at a time from python (see `_plan`).
+
+The objects in the tree are bound as template children, so `execute` can
+still collect them into the instance's list of objects, and ``get_object``
+and ``connect_signals`` work as usual. Unlike with the python backend, the
+objects other than the root are instances of the Gtk classes named in the
+glade file, rather than of the classes generated for them.
+
+`install` leaves the class alone, so that the python backend is used, if
+its plan does anything a template can't express: deferred subtrees,
+references to other objects (including shared ones), images and the
+contents of list stores. Templates can't be inherited either, so they are
+only installed on the classes generated by a builder, not on subclasses of
+them.
+"""
+from . import _plan
+from ._utils import gi_module
+
+import logging
+import xml.etree.ElementTree as ET
+
+logger = logging.getLogger(__name__)
+
+# The steps which a template can express.
+_EXPRESSIBLE = frozenset([
+    _plan.CREATE,
+    _plan.SET,
+    _plan.ADD,
+    _plan.CHILD_SET,
+    _plan.FREEZE,
+    _plan.THAW,
+])
+
+
+class _Inexpressible(Exception):
+    pass
+
+
+def install(cls, plan):
+    """Register a composite template on the generated class `cls`.
+
+    `plan` is the `_plan.Plan` of `cls`. Returns True if the template was
+    installed, or False if `cls` must be built by the plan instead.
+    """
+    Gtk = gi_module('Gtk')
+    if cls._builder.get(cls._ident) is not cls or \
+            not issubclass(cls, Gtk.Widget) or plan.deferred or \
+            plan.externals:
+        return False
+    for step in plan.steps:
+        if step[0] not in _EXPRESSIBLE:
+            return False
+    try:
+        template = to_xml(cls)
+    except _Inexpressible as e:
+        logger.debug("Not using a template for %r: %s", cls._ident, e)
+        return False
+    cls.set_template(gi_module('GLib').Bytes.new(template))
+    for name in plan.names[1:]:
+        cls.bind_template_child_full(name, False, 0)
+    return True
+
+
+def execute(plan, root):
+    """Build the tree of `root` from its class's template.
+
+    Returns a list of the objects in the tree, indexed by slot, like
+    `_plan.execute`.
+    """
+    root.init_template()
+    gtype = type(root).__gtype__
+    return [root] + [root.get_template_child(gtype, name)
+                     for name in plan.names[1:]]
+
+
+def to_xml(cls):
+    """Return the composite template for the generated class `cls`, as bytes.
+
+    Raises `_Inexpressible` if some value can't be written as text.
+    """
+    root = ET.Element('interface')
+    template = ET.SubElement(root, 'template', {
+        'class': cls.__gtype__.name,
+        'parent': cls._parent_class.__gtype__.name,
+    })
+    _fill(template, cls)
+    return ET.tostring(root, encoding='utf-8')
+
+
+def _fill(elt, cls):
+    """Add the properties and children of `cls` to the element `elt`."""
+    _add_properties(elt, cls._properties)
+    builder = cls._builder
+    for child_ident in cls._children:
+        child_cls = builder[child_ident]
+        child = ET.SubElement(elt, 'child')
+        obj = ET.SubElement(child, 'object', {
+            'class': child_cls._parent_class.__gtype__.name,
+            'id': child_ident,
+        })
+        _fill(obj, child_cls)
+        if child_cls._child_properties:
+            _add_properties(ET.SubElement(child, 'packing'),
+                            child_cls._child_properties)
+
+
+def _add_properties(elt, properties):
+    for prop in properties:
+        if prop.reference:
+            raise _Inexpressible("property %r refers to %r" %
+                                 (prop.key, prop.value))
+        ET.SubElement(elt, 'property', {'name': prop.key}).text = \
+            value_text(prop.value)
+
+
+def value_text(value):
+    """Return the text GtkBuilder would convert to the converted `value`.
+
+    Raises `_Inexpressible` if there is none.
+    """
+    if isinstance(value, bool):
+        return 'True' if value else 'False'
+    if isinstance(value, str):
+        return value
+    GObject = gi_module('GObject')
+    if isinstance(value, (GObject.GEnum, GObject.GFlags, int)):
+        return str(int(value))
+    if isinstance(value, float):
+        return repr(value)
+    if isinstance(value, GObject.GType):
+        return value.name
+    if type(value).__name__ in ('RGBA', 'Color'):
+        return value.to_string()
+    raise _Inexpressible("can't write %r as text" % (value,))
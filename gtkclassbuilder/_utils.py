@@ -1,25 +1,31 @@
+import functools
+import importlib
 import re
 
-# has_handler and get_handler implement the dict vs non dict logic needed by
+# The gi namespaces imported by gi_module, and the classes found by
+# gi_class, by name. These are shared by every builder.
+_modules = {}
+_classes = {}
+
+# handler_lookup implements the dict vs non dict logic needed by
 # .builder.BuiltObject.connect_signals. If the user passes a dictionary, want
 # to use the contents of the dictonary as our handlers, and otherwise we want
 # to use the object's attributes.
 
 
-def has_handler(handlers, name):
-    """Return a boolean indicating whether `handlers` has the named handler."""
-    if type(handlers) is dict:
-        return name in handlers
-    else:
-        return hasattr(handlers, name)
+def _get_attribute(handlers, name):
+    return getattr(handlers, name, None)
+
 
+def handler_lookup(handlers):
+    """Return a function which finds handlers in `handlers` by name.
 
-def get_handler(handlers, name):
-    """Get the handler with the given name from `handlers`."""
+    The function returns None if there is no handler with the given name.
+    """
     if type(handlers) is dict:
-        return handlers[name]
+        return handlers.get
     else:
-        return getattr(handlers, name)
+        return functools.partial(_get_attribute, handlers)
 
 
 def namespace_split(identifier):
@@ -34,3 +40,30 @@ def namespace_split(identifier):
         return ':'.join(match.groups())
     repl = re.sub(r'([a-z])([A-Z])', replacement, identifier, count=1)
     return repl.split(':')
+
+
+def gi_module(namespace):
+    """Return the module ``gi.repository.<namespace>``.
+
+    Importing gi namespaces (in particular ``Gtk``) is slow, so the library
+    only does so when they are first needed, through this function.
+    """
+    module = _modules.get(namespace)
+    if module is None:
+        module = importlib.import_module('gi.repository.' + namespace)
+        _modules[namespace] = module
+    return module
+
+
+def gi_class(name):
+    """Return the class named by the ``class`` attribute `name`.
+
+    For example, ``gi_class('GtkWindow')`` is ``Gtk.Window``. Each name is
+    only resolved once.
+    """
+    cls = _classes.get(name)
+    if cls is None:
+        module_name, class_name = namespace_split(name)
+        cls = getattr(gi_module(module_name), class_name)
+        _classes[name] = cls
+    return cls
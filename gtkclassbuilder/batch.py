@@ -0,0 +1,253 @@
+"""Validating and compiling many ``.glade`` files at once.
+
+Usage::
+
+    python -m gtkclassbuilder.batch DIR [DIR ...] [-j JOBS] [--cache]
+
+Every ``.glade`` file under the given directories (which may also be
+individual files) is validated and compiled, in a pool of worker processes
+with one process per core by default. Each ``foo.glade`` is compiled to
+``foo_ui.py`` next to it, as by `gtkclassbuilder.compile`; with ``--cache``,
+the on-disk cache used by `from_filename` is filled instead (see
+`configure_cache`).
+
+A file which fails to validate or compile is reported, and the run carries
+on with the others; the exit status is 1 if any file failed. The time taken
+by each file, and by the whole run, is printed.
+
+The content hash of each file processed successfully is recorded in a
+manifest, ``.gtkclassbuilder-batch.json``, in each directory given. Running
+the command again skips files which haven't changed since, so it costs
+little more than reading them.
+"""
+from . import _cache, _from_bytes
+from .compile import generate
+
+import argparse
+import concurrent.futures
+import json
+import logging
+import os
+import sys
+import time
+
+logger = logging.getLogger(__name__)
+
+MANIFEST = '.gtkclassbuilder-batch.json'
+
+
+class Result(object):
+    """The outcome of processing one glade file.
+
+    `status` is one of ``'compiled'``, ``'unchanged'`` or ``'failed'``;
+    `error` describes the failure, if any. `seconds` is the time taken.
+    """
+
+    __slots__ = ('filename', 'status', 'error', 'seconds')
+
+    def __init__(self, filename, status, error=None, seconds=0.0):
+        self.filename = filename
+        self.status = status
+        self.error = error
+        self.seconds = seconds
+
+
+def output_filename(filename):
+    """Return the name of the module `filename` is compiled to."""
+    return os.path.splitext(filename)[0] + '_ui.py'
+
+
+def process(filename, cache=False, construct_properties=False):
+    """Validate and compile the glade file `filename`.
+
+    If `cache` is True, the result is stored in the on-disk cache; otherwise
+    it is written to `output_filename`. Returns a `Result`. This is what
+    each worker process runs.
+    """
+    start = time.perf_counter()
+    try:
+        with open(filename, 'rb') as f:
+            contents = f.read()
+        builder = _from_bytes(contents,
+                              construct_properties=construct_properties,
+                              directory=os.path.dirname(
+                                  os.path.abspath(filename)))
+        if cache:
+            _store(contents, builder)
+        else:
+            _write(output_filename(filename),
+                   generate(builder, source=os.path.basename(filename)))
+    except Exception as e:
+        return Result(filename, 'failed', '%s: %s' % (type(e).__name__, e),
+                      time.perf_counter() - start)
+    return Result(filename, 'compiled',
+                  seconds=time.perf_counter() - start)
+
+
+def _store(contents, builder):
+    errors = _cache.stats()['errors']
+    _cache.store(_cache.key(contents), builder._to_records)
+    if _cache.stats()['errors'] != errors:
+        raise IOError("Failed to write the cache entry in %r" %
+                      _cache.directory())
+
+
+def _write(filename, source):
+    tmp_filename = '%s.%d.tmp' % (filename, os.getpid())
+    with open(tmp_filename, 'w') as f:
+        f.write(source)
+    os.replace(tmp_filename, filename)
+
+
+def find(paths):
+    """Find the glade files to process.
+
+    Returns a list of ``(directory, filenames)`` pairs: each of `paths`
+    which is a directory is searched recursively for ``.glade`` files,
+    while files are taken as they are, grouped by their directory.
+    """
+    groups = []
+    for path in paths:
+        if os.path.isdir(path):
+            filenames = []
+            for dirpath, dirnames, names in os.walk(path):
+                dirnames.sort()
+                filenames.extend(os.path.join(dirpath, name)
+                                 for name in sorted(names)
+                                 if name.endswith('.glade'))
+            groups.append((path, filenames))
+        else:
+            groups.append((os.path.dirname(path) or '.', [path]))
+    return groups
+
+
+def _stamp(filename, cache, construct_properties):
+    """Return a string identifying the content of `filename` and options."""
+    with open(filename, 'rb') as f:
+        contents = f.read()
+    return '%s:%s:%s' % (_cache.key(contents), cache, construct_properties)
+
+
+def _up_to_date(filename, stamp, manifest, cache):
+    if manifest.get(os.path.abspath(filename)) != stamp:
+        return False
+    if cache:
+        return os.path.exists(_cache._path(stamp.split(':')[0]))
+    return os.path.exists(output_filename(filename))
+
+
+def _load_manifest(directory):
+    try:
+        with open(os.path.join(directory, MANIFEST)) as f:
+            return json.load(f)
+    except (IOError, OSError, ValueError):
+        return {}
+
+
+def _save_manifest(directory, manifest):
+    try:
+        _write(os.path.join(directory, MANIFEST),
+               json.dumps(manifest, indent=1, sort_keys=True))
+    except (IOError, OSError) as e:
+        logger.warning("Failed to write manifest in %r: %s", directory, e)
+
+
+def run(paths, jobs=None, cache=False, construct_properties=False,
+        report=None):
+    """Validate and compile the glade files found in `paths`.
+
+    See the module docstring. `jobs` is the number of worker processes (by
+    default, the number of cores); if it is 1, the files are processed in
+    this process. `report` is called with each `Result` as it becomes
+    available. Returns the list of results, in no particular order.
+    """
+    results = []
+    pending = {}
+    for directory, filenames in find(paths):
+        manifest = _load_manifest(directory)
+        for filename in filenames:
+            try:
+                stamp = _stamp(filename, cache, construct_properties)
+            except (IOError, OSError) as e:
+                results.append(Result(filename, 'failed',
+                                      '%s: %s' % (type(e).__name__, e)))
+                continue
+            if _up_to_date(filename, stamp, manifest, cache):
+                results.append(Result(filename, 'unchanged'))
+            else:
+                pending[filename] = (directory, manifest, stamp)
+    if report is not None:
+        for result in results:
+            report(result)
+
+    def done(result):
+        directory, manifest, stamp = pending[result.filename]
+        key = os.path.abspath(result.filename)
+        if result.status == 'compiled':
+            manifest[key] = stamp
+        else:
+            manifest.pop(key, None)
+        results.append(result)
+        if report is not None:
+            report(result)
+
+    if jobs == 1:
+        for filename in pending:
+            done(process(filename, cache, construct_properties))
+    elif pending:
+        with concurrent.futures.ProcessPoolExecutor(jobs) as executor:
+            futures = [executor.submit(process, filename, cache,
+                                       construct_properties)
+                       for filename in pending]
+            for future in concurrent.futures.as_completed(futures):
+                done(future.result())
+
+    saved = set()
+    for directory, manifest, _ in pending.values():
+        if directory not in saved:
+            saved.add(directory)
+            _save_manifest(directory, manifest)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m gtkclassbuilder.batch',
+        description='Validate and compile many glade files in parallel.')
+    parser.add_argument('paths', nargs='+', metavar='DIR',
+                        help='a directory to search for .glade files, or a '
+                        '.glade file')
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help='number of worker processes (default: the '
+                        'number of cores)')
+    parser.add_argument('--cache', action='store_true',
+                        help='fill the on-disk cache instead of writing '
+                        'modules')
+    parser.add_argument('--construct-properties', action='store_true',
+                        help='pass properties to the Gtk constructor in the '
+                        'generated modules; see Builder')
+    args = parser.parse_args(argv)
+
+    def report(result):
+        line = '%8.3fs  %-9s  %s' % (result.seconds, result.status,
+                                      result.filename)
+        if result.error is not None:
+            line += ': ' + result.error
+        print(line)
+
+    start = time.perf_counter()
+    results = run(args.paths, jobs=args.jobs, cache=args.cache,
+                  construct_properties=args.construct_properties,
+                  report=report)
+    counts = dict((status, 0)
+                  for status in ('compiled', 'unchanged', 'failed'))
+    for result in results:
+        counts[result.status] += 1
+    print('%d files: %d compiled, %d unchanged, %d failed in %.3fs' % (
+        len(results), counts['compiled'], counts['unchanged'],
+        counts['failed'], time.perf_counter() - start))
+    return 1 if counts['failed'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
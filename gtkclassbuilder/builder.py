@@ -1,14 +1,36 @@
 
-from . import _check
-from ._utils import has_handler, get_handler, namespace_split
+from . import _check, _convert, _images, _model, _plan, _pool, _prebuild
+from . import _template
+from ._instrument import instrumentation
+from ._utils import gi_class, handler_lookup
 
-from gi.repository import Gtk
-import importlib
+import functools
 import logging
 
 
 logger = logging.getLogger(__name__)
 
+# The classes whose constructors (as overridden by PyGObject) don't take
+# properties as keyword arguments: ``Gtk.ListStore(*column_types)``, for
+# instance, or ``Gtk.TreeViewColumn(title, cell_renderer, **attributes)``.
+_POSITIONAL_INIT = frozenset([
+    'Gtk.ListStore',
+    'Gtk.TreeStore',
+    'Gtk.TreeViewColumn',
+])
+
+# The keys of each record returned by Builder._to_records.
+_RECORD_KEYS = frozenset([
+    'id',
+    'class',
+    'properties',
+    'signals',
+    'children',
+    'child_properties',
+    'columns',
+    'rows',
+])
+
 
 class BuiltObject(object):
     """An object generated from a ``.glade`` file.
@@ -24,23 +46,130 @@ class BuiltObject(object):
     function. These instances can be accessed via the `get_object` method.
     """
 
-    def __init__(self, _builder, _objects):
+    def __init__(self):
         # This should only be invoked by subclases constructed by the library.
-        #
-        # _builder is the builder constructed when reading the glade file.
-        # _objects is a dictionary of objects corresponding to this
-        # instantiation of the glade file.
-        if _objects is None:
-            _objects = {}
-        for prop in self._properties:
-            prop.set(self, _builder, _objects)
-        for child_class_name in self._children:
-            child = _builder[child_class_name](_objects)
-            self.add(child)
-            for prop in child._child_properties:
-                prop.set_child(self, child, _builder, _objects)
-        self._objects = _objects
-        _objects[self.__class__.__name__] = self
+        plan = type(self)._get_plan()
+        if instrumentation.enabled:
+            instrumentation.build(plan, self, _build)
+        else:
+            _build(plan, self)
+
+    @classmethod
+    def _construct_steps(cls):
+        """Instantiate `cls` one step at a time.
+
+        This is a generator, which yields None after each step of the
+        instantiation plan, and finally yields the new instance. It is used
+        to spread the construction of large widgets over several iterations
+        of the main loop; see `Builder.prebuild`. `cls` must be a class
+        generated by the library, not a subclass of one.
+        """
+        obj = cls.__new__(cls)
+        cls._parent_class.__init__(obj, **cls._construct_properties)
+        yield
+        plan = cls._get_plan()
+        if plan.template:
+            # The whole tree is built by a single call.
+            created = _template.execute(plan, obj)
+            yield
+        else:
+            created = [None] * len(plan.names)
+            created[0] = obj
+            for _ in _plan.execute_steps(plan, created):
+                yield
+        _Instance(plan, created)
+        if instrumentation.enabled:
+            instrumentation.built(plan, obj)
+        yield obj
+
+    @classmethod
+    def instantiate_many(cls, n, init=None):
+        """Return a list of `n` new instances of this class.
+
+        This is equivalent to calling the class `n` times, but the work which
+        is the same for every instance (finding the plan, the constructor and
+        its arguments) is only done once. If `init` is not None, it is called
+        as ``init(obj, objects)`` for each new instance `obj`, where `objects`
+        is the registry of the objects created along with it;
+        ``objects[name]`` is the same as ``obj.get_object(name)``::
+
+            >>> rows = MessageRow.instantiate_many(
+            ...     len(messages),
+            ...     init=lambda row, objects: fill_row(objects, messages))
+
+        See `instantiate_chunks` for a form which returns to the caller every
+        so often.
+        """
+        result = []
+        for chunk in cls.instantiate_chunks(n, max(n, 1), init):
+            result.extend(chunk)
+        return result
+
+    @classmethod
+    def instantiate_chunks(cls, n, chunk_size, init=None):
+        """Create `n` new instances of this class, `chunk_size` at a time.
+
+        This is a generator, which yields lists of at most `chunk_size`
+        instances, so that the caller can let the main loop run between
+        chunks (for example, by driving it from ``GLib.idle_add``). `init` is
+        as for `instantiate_many`.
+        """
+        plan = cls._get_plan()
+        if cls._builder.get(cls._ident) is cls:
+            parent_init = cls._parent_class.__init__
+            construct_properties = cls._construct_properties
+
+            def create():
+                obj = cls.__new__(cls)
+                parent_init(obj, **construct_properties)
+                if instrumentation.enabled:
+                    return instrumentation.build(plan, obj, _build)
+                return _build(plan, obj)
+        else:
+            # A subclass of a generated class may have its own __init__,
+            # which must run.
+            def create():
+                return cls()._instance
+
+        chunk = []
+        for _ in range(n):
+            instance = create()
+            obj = instance.objects[0]
+            if init is not None:
+                init(obj, instance)
+            chunk.append(obj)
+            if len(chunk) == chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    @classmethod
+    def _shared_instance(cls):
+        """Return the instance of `cls` shared by the whole builder.
+
+        It is created the first time it is needed; see the `shared` option
+        of `Builder`.
+        """
+        obj = cls.__dict__.get('_shared')
+        if obj is None:
+            obj = cls()
+            cls._shared = obj
+        return obj
+
+    @classmethod
+    def _get_plan(cls):
+        """Return the `_plan.Plan` for instantiating `cls`.
+
+        The plan is compiled the first time it is needed, unless it was
+        compiled when the class was generated (see
+        `Builder._install_template`).
+        """
+        plan = cls.__dict__.get('_compiled_plan')
+        if plan is None:
+            plan = _plan.compile(cls._builder, cls._ident)
+            cls._compiled_plan = plan
+        return plan
 
     def get_object(self, name):
         """Return the associated instance of the object called `name`.
@@ -49,8 +178,11 @@ class BuiltObject(object):
         of the objects it depends upon (children, models...) are also
         instantiated. `get_object` is used to fetch these intstances by
         name.
+
+        If the object is part of a subtree whose construction was deferred
+        (see the `lazy` argument to `Builder`), the subtree is built first.
         """
-        return self._objects[name]
+        return self._instance.get_object(name)
 
     def connect_signals(self, handlers):
         """Connect the signals defined on self to then handlers in `handlers`.
@@ -61,78 +193,297 @@ class BuiltObject(object):
             1. If `handlers` is a dictionary, then the signal will be
                connected to `handlers['on_change']`.
             2. Otherwise, the signal will be connected to `hanlders.on_change`.
+
+        The signals of all of the objects created along with this one
+        (children, models, buffers...) are connected as well, including those
+        in deferred subtrees, once they are built.
+        """
+        instance = self._instance
+        plan = type(self)._get_plan()
+        if instrumentation.enabled:
+            instrumentation.connect(
+                self, lambda: instance.connect_signals(plan, handlers))
+        else:
+            instance.connect_signals(plan, handlers)
+
+    @classmethod
+    def pool(cls, max_size=None):
+        """Return a pool of recycled instances of this class.
+
+        Each class has a single pool, created by the first call to this
+        method (with a maximum size of 16, unless `max_size` is given); later
+        calls return the same pool, with its maximum size changed to
+        `max_size` if it is not None. See `Pool` for details::
+
+            >>> pool = MessageRow.pool(max_size=64)
+            >>> row = pool.acquire()
+            >>> # ...
+            >>> pool.release(row)
+        """
+        pool = cls.__dict__.get('_instance_pool')
+        if pool is None:
+            pool = _pool.Pool(cls, 16 if max_size is None else max_size)
+            cls._instance_pool = pool
+        elif max_size is not None:
+            pool.resize(max_size)
+        return pool
+
+    def _recycle(self):
+        """Return this instance to the state it was in when created.
+
+        The instance is removed from its parent (if any), the handlers
+        connected by `connect_signals` are disconnected, and the properties
+        declared in the glade file are restored.
+        """
+        parent = self.get_parent() if hasattr(self, 'get_parent') else None
+        if parent is not None:
+            parent.remove(self)
+        instance = self._instance
+        instance.disconnect_signals()
+        plan = type(self)._get_plan()
+        instance.reset(plan, translate=plan is not instance.plan)
+
+
+def _build(plan, obj):
+    """Build the objects of a new instance of `plan`, rooted at `obj`."""
+    if plan.template:
+        return _Instance(plan, _template.execute(plan, obj))
+    return _Instance(plan, _plan.execute(plan, obj))
+
+
+class _Instance(object):
+    """The objects created by one instantiation of a generated class.
+
+    Every one of those objects refers to the `_Instance` through its
+    ``_instance`` attribute.
+
+    `plan` is the `_plan.Plan` of the generated class, and `objects` is the
+    list of objects, indexed as described there; objects in deferred
+    subtrees which have not been built yet are None. `handlers` lists the
+    ``(plan, handlers)`` arguments of each call to `connect_signals`, which
+    are connected to deferred subtrees when they are built, and
+    `handler_ids` lists ``(object, handler_id)`` pairs for every handler
+    connected.
+
+    Indexing an `_Instance` with an id is the same as `get_object`.
+
+    When the root object is destroyed, `release` drops the references to
+    the objects, so that the tree does not have to wait for the cycle
+    collector to be freed.
+    """
+
+    __slots__ = ('plan', 'objects', 'handlers', 'handler_ids')
+
+    def __init__(self, plan, created):
+        self.plan = plan
+        created.extend([None] * (len(plan.index) - len(created)))
+        self.objects = created
+        self.handlers = []
+        self.handler_ids = []
+        self._add(plan, created)
+        root = created[0]
+        if hasattr(root, 'destroy'):
+            root.connect_after('destroy', _release)
+
+    def _add(self, plan, created):
+        objects = self.objects
+        for slot, obj in zip(plan.instance_slots, created):
+            objects[slot] = obj
+        for slot in plan.owned:
+            created[slot]._instance = self
+        for deferred in plan.deferred:
+            created[deferred.slot].connect('map', _on_placeholder_map,
+                                           deferred)
+
+    def _expand(self, slot):
+        """Build the deferred subtree containing the object in `slot`."""
+        deferred, placeholder_slot = self.plan.owners[slot]
+        placeholder = self.objects[placeholder_slot]
+        if placeholder is None:
+            self._expand(placeholder_slot)
+            placeholder = self.objects[placeholder_slot]
+        created = _plan.execute_deferred(deferred, placeholder, self.objects)
+        self._add(deferred.plan, created)
+        for plan, handlers in self.handlers:
+            if plan is self.plan:
+                self._connect(deferred.plan, handlers)
+                continue
+            # The signals were connected for an object other than the root,
+            # so only connect them if the subtree is beneath that object.
+            inner = _find_deferred(plan, deferred.ident)
+            if inner is not None:
+                self._connect(inner.plan, handlers, translate=True)
+
+    def objects_of(self, plan, translate=False):
+        """Return the objects of `plan`, indexed by its slots.
+
+        `plan` is the instance's plan or one of its deferred subtrees, or,
+        if `translate` is True, the plan of the class of one of the
+        instance's other objects (or one of its subtrees). The slots of
+        the latter are numbered differently from the instance's, so its
+        objects are found by name.
+        """
+        if translate:
+            index = self.plan.index
+            return [self.objects[index[name]] for name in plan.names]
+        return [self.objects[slot] for slot in plan.instance_slots]
+
+    def reset(self, plan, translate=False):
+        """Restore the declared properties of the objects of `plan`.
+
+        The deferred subtrees of `plan` which have been built are reset
+        too. `translate` is as for `objects_of`.
+        """
+        _plan.reset(plan, self.objects_of(plan, translate))
+        index = self.plan.index
+        for deferred in plan.deferred:
+            if self.objects[index[deferred.ident]] is not None:
+                self.reset(deferred.plan, translate)
+
+    def get_object(self, name):
+        slot = self.plan.index[name]
+        obj = self.objects[slot]
+        if obj is None and slot in self.plan.owners:
+            self._expand(slot)
+            obj = self.objects[slot]
+        return obj
+
+    __getitem__ = get_object
+
+    def connect_signals(self, plan, handlers):
+        """Connect the signals of `plan` to `handlers`.
+
+        `plan` is the plan of the class of one of the instance's objects;
+        only the signals of that object's subtree are connected. Returns
+        the number of handlers connected.
         """
-        for k, v in self._signals.items():
-            if has_handler(handlers, v):
-                self.connect(k, get_handler(handlers, v))
-        if len(self._children) != 0:
-            for child in self.get_children():
-                if isinstance(child, BuiltObject):
-                    child.connect_signals(handlers)
+        connected = len(self.handler_ids)
+        self.handlers.append((plan, handlers))
+        self._connect(plan, handlers, translate=plan is not self.plan)
+        return len(self.handler_ids) - connected
+
+    def _connect(self, plan, handlers, translate=False):
+        """Connect the signals of `plan`, and its built deferred subtrees.
+
+        If `translate` is True, `plan` is not the instance's plan or one of
+        its subtrees, so its slots are translated by name (see
+        `objects_of`).
+        """
+        lookup = handler_lookup(handlers)
+        index = self.plan.index
+        if translate:
+            slots = [index[name] for name in plan.names]
+        else:
+            slots = plan.instance_slots
+        for handler_name, connections in plan.signals:
+            handler = lookup(handler_name)
+            if handler is None:
+                continue
+            for slot, signal in connections:
+                obj = self.objects[slots[slot]]
+                self.handler_ids.append((obj, obj.connect(signal, handler)))
+        for deferred in plan.deferred:
+            if self.objects[index[deferred.ident]] is not None:
+                self._connect(deferred.plan, handlers, translate)
+
+    def disconnect_signals(self):
+        """Disconnect all of the handlers connected by `connect_signals`."""
+        for obj, handler_id in self.handler_ids:
+            obj.disconnect(handler_id)
+        self.handlers = []
+        self.handler_ids = []
+
+    def release(self):
+        """Drop all references to the objects of the instance."""
+        self.objects = [None] * len(self.objects)
+        self.handlers = []
+        self.handler_ids = []
+
+
+def _find_deferred(plan, ident):
+    """Return the `_plan.Deferred` for `ident` in `plan`, or None."""
+    for deferred in plan.deferred:
+        if deferred.ident == ident:
+            return deferred
+        inner = _find_deferred(deferred.plan, ident)
+        if inner is not None:
+            return inner
+    return None
+
+
+def _on_placeholder_map(placeholder, deferred):
+    # This is a plain function, rather than a method of _Instance, so that
+    # the signal handler doesn't keep the instance alive.
+    instance = placeholder._instance
+    slot = deferred.plan.instance_slots[0]
+    if instance.objects[slot] is None:
+        instance._expand(slot)
+
+
+def _release(root):
+    root._instance.release()
 
 
 class Property(object):
+    """A single ``<property>`` of an object, or of its packing.
 
-    _enums = {
-        "item_orientation": Gtk.Orientation,
-        "orientation": Gtk.Orientation,
-        "justify": Gtk.Justification,
-        "relief": Gtk.ReliefStyle,
-        "shadow_type": Gtk.ShadowType,
-        "wrap_mode": Gtk.WrapMode,
-    }
+    The value of the property is converted from text when the class is
+    generated (see `Property.from_element`), so setting it on an instance
+    only requires assigning `value`. If `reference` is True, `value` is the
+    id of another object in the glade file, which is created along with the
+    instance.
+    """
 
+    # Properties which are assumed to refer to other objects when they cannot
+    # be found on the class being generated.
     _references = set([
         "buffer",
         "image",
         "model",
     ])
 
-    def __init__(self, elt):
-        self.key = elt.attrib['name']
+    __slots__ = ('key', 'value', 'reference')
+
+    def __init__(self, key, value, reference=False):
+        self.key = key
+        self.value = value
+        self.reference = reference
+
+    @classmethod
+    def from_element(cls, elt, pspec):
+        """Create a `Property` from the ``<property>`` element `elt`.
+
+        `pspec` is the ``GParamSpec`` describing the property, or None if it
+        is not known.
+        """
         # TODO: We should check for a "translateable" attribute, and
         # internationalize the value as appropriate.
-        self._value = elt.text
-
-    def set(self, object, _builder, _objects):
-        try:
-            object.set_property(self.key, self._get_value(_builder, _objects))
-        except TypeError:
-            import pdb; pdb.set_trace()
-
-    def set_child(self, parent, child, _builder, _objects):
-        parent.child_set_property(child,
-                                  self.key,
-                                  self._get_value(_builder, _objects))
-
-    def _get_value(self, _builder, _objects):
-        if self.key in self._references:
-            # a reference refers to another object in the glade file by it's id.
-            # We want to fetch that object out of _objects, but it's possible
-            # that it hasn't been created yet. If so, we need to make it
-            # first.
-            if self._value not in _objects:
-                _builder[self._value](_objects)
-            return _objects[self._value]
-
-        if self.key in self._enums:
-            return getattr(self._enums[self.key], self._value.upper())
-
-        return self._guess_value()
-
-    def _guess_value(self):
-        """Try to guess the correct type based on the text.
-
-        Return the corresponding value.
-        """
-        if self._value == 'True':
-            return True
-        if self._value == 'False':
-            return False
-        try:
-            return int(self._value)
-        except ValueError:
-            return self._value
+        return cls.from_text(elt.attrib['name'], elt.text, pspec)
+
+    @classmethod
+    def from_text(cls, key, text, pspec):
+        """Create a `Property` named `key` from its textual value `text`.
+
+        `pspec` is as for `from_element`.
+        """
+        if pspec is None:
+            if key in cls._references:
+                return cls(key, text, reference=True)
+            return cls(key, _convert.guess(text))
+        image = _images.from_property(pspec, text)
+        if image is not None:
+            return cls(key, image)
+        if _convert.is_reference(pspec):
+            return cls(key, text, reference=True)
+        return cls(key, _convert.convert(pspec, text))
+
+    def _to_record(self):
+        return [self.key, _convert.encode(self.value), self.reference]
+
+    @classmethod
+    def _from_record(cls, record):
+        key, value, reference = record
+        return cls(key, _convert.decode(value), reference=reference)
 
 
 class Builder(dict):
@@ -141,64 +492,439 @@ class Builder(dict):
     The method `_from_root` populates the builder based on the xml tree rooted
     at `elt`. Each of the ``_do_*`` methods processes elements in the tree
     with the corresponding name.
+
+    If `construct_properties` is True, the generated classes pass all of
+    their (non-reference) properties to the Gtk constructor in a single call,
+    rather than setting them one at a time after the object is created. This
+    is faster, and means the properties are already set before any
+    ``notify`` handlers run. Child (packing) properties and references to
+    other objects are still set individually, as are all of the properties
+    of classes whose constructors take other arguments (see
+    `_POSITIONAL_INIT`).
+
+    `lazy` is a collection of object ids and/or glade class names (such as
+    ``GtkNotebook`` or ``GtkStack``). The children of the matching
+    containers are not built along with the rest of an instance. Instead, a
+    placeholder is added in their place, and each child is built the first
+    time its placeholder is mapped (e.g. when a notebook page is selected),
+    or one of the objects inside it is requested with ``get_object``.
+
+    If `freeze_notify` is True (the default), each object's ``notify`` signal
+    is frozen while an instance is being built, and thawed once the whole
+    tree has been assembled, so that handlers see each changed property once
+    rather than once per step. See `NotifyCounter`.
+
+    `shared` is a collection of object ids. When an instance refers to one
+    of these objects through a property (such as the ``model`` of a combo
+    box, or the ``buffer`` of a text view), it gets a single instance of the
+    object shared by the whole builder, rather than a copy of its own. This
+    is meant for objects which are not modified per instance, such as a
+    read-only list of choices. Since loading the same document again
+    returns the same builder (see `Registry`), the objects are effectively
+    shared by the whole process. Their signals are not connected by the
+    ``connect_signals`` of the instances referring to them, and they are not
+    reset when those instances are recycled. Objects which are children of
+    other objects are never shared.
+
+    Images named by properties (see `_images`) are decoded once and shared
+    by all instances; relative file names are looked for in `directory`
+    (the current directory if None).
+
+    `backend` selects how instances are built. With ``'python'`` (the
+    default), every object is created, configured and packed from python.
+    With ``'template'``, each widget class whose tree can be expressed as a
+    GTK composite template gets one, and its instances are built by GTK in a
+    single call; the other classes fall back to the python backend. See
+    `_template`.
+
+    `source` is the name of the file the builder was loaded from, if any;
+    it is only used to report statistics (see `_instrument`).
+
+    Classes are generated lazily: the first time an id is looked up (directly,
+    or because an instance of another class needs it as a child or
+    reference). Checking whether an id is present, or listing the ids with
+    ``keys()``, does not generate anything.
     """
 
+    def __init__(self, construct_properties=False, lazy=(),
+                 freeze_notify=True, shared=(), directory=None, source=None,
+                 backend='python'):
+        if backend not in ('python', 'template'):
+            raise ValueError("Unknown backend %r" % (backend,))
+        dict.__init__(self)
+        self.construct_properties = construct_properties
+        self.lazy = frozenset(lazy)
+        self.freeze_notify = freeze_notify
+        self.shared = frozenset(shared)
+        self.directory = directory
+        self.source = source
+        self.backend = backend
+        # _ids lists every id in the builder, in document order. _pending maps
+        # the ids of classes which have not been generated yet to functions
+        # which return their definitions (see _definition). _child_ids is the
+        # set of ids which are children of other objects.
+        self._ids = []
+        self._pending = {}
+        self._child_ids = set()
+
+    def _declare(self, ident, describe, child=False):
+        """Declare the class `ident`.
+
+        `describe` is called, the first time the definition of the class is
+        needed, to return it (see `_definition`). `child` is True if the
+        object is the child of another object.
+        """
+        self._ids.append(ident)
+        self._pending[ident] = describe
+        if child:
+            self._child_ids.add(ident)
+
+    def _definition(self, ident):
+        """Return the definition of the class `ident`.
+
+        This is a dict of the arguments to `_define`, other than `ident`: the
+        class's properties are converted, but the class itself is not
+        generated.
+        """
+        if dict.__contains__(self, ident):
+            cls = dict.__getitem__(self, ident)
+            return {
+                'parent_class': cls._parent_class,
+                'properties': cls._properties,
+                'signals': cls._signals,
+                'children': cls._children,
+                'child_properties': cls._child_properties,
+                'columns': cls._columns,
+                'rows': cls._rows,
+            }
+        definition = self._pending[ident]()
+        self._pending[ident] = functools.partial(dict, definition)
+        return definition
+
+    def _generate(self, ident):
+        self._define(ident, **self._definition(ident))
+        if self.backend == 'template':
+            self._install_template(ident)
+
+    def _install_template(self, ident):
+        """Give the class `ident` a composite template, if it can have one.
+
+        The class's plan is compiled here, to find out; see
+        `_template.install`. This is done as soon as the class is generated,
+        before it has any instances.
+        """
+        cls = dict.__getitem__(self, ident)
+        plan = _plan.compile(self, ident)
+        plan.template = _template.install(cls, plan)
+        cls._compiled_plan = plan
+
+    def _install_templates(self):
+        """Call `_install_template` for every class defined by `_define`.
+
+        This is called by modules generated by `gtkclassbuilder.compile`,
+        once all of their classes have been defined.
+        """
+        if self.backend != 'template':
+            return
+        for ident in self._ids:
+            if dict.__contains__(self, ident) and \
+                    '_compiled_plan' not in dict.__getitem__(
+                        self, ident).__dict__:
+                self._install_template(ident)
+
+    def __missing__(self, ident):
+        if ident not in self._pending:
+            raise KeyError(ident)
+        generate = functools.partial(self._generate, ident)
+        if instrumentation.enabled:
+            instrumentation.generate(self, ident, generate)
+        else:
+            generate()
+        del self._pending[ident]
+        return dict.__getitem__(self, ident)
+
+    def __contains__(self, ident):
+        return dict.__contains__(self, ident) or ident in self._pending
+
+    def __iter__(self):
+        return iter(self._ids)
+
+    def __len__(self):
+        return len(self._ids)
+
+    def keys(self):
+        return list(self._ids)
+
+    def values(self):
+        return [self[ident] for ident in self._ids]
+
+    def items(self):
+        return [(ident, self[ident]) for ident in self._ids]
+
+    def get(self, ident, default=None):
+        if ident in self:
+            return self[ident]
+        return default
+
+    def _shares(self, ident):
+        """Return whether instances share the object `ident`.
+
+        Those named by `shared` are, unless they are the child of some other
+        object.
+        """
+        return ident in self.shared and ident not in self._child_ids
+
+    def _defers_children(self, cls):
+        """Return whether the children of the class `cls` are deferred."""
+        if not self.lazy:
+            return False
+        class_name = _convert.class_name(cls._parent_class).replace('.', '')
+        return cls._ident in self.lazy or class_name in self.lazy
+
+    def prebuild(self, ident, count=1, budget=0.004, priority=None):
+        """Build `count` instances of the class `ident` in the background.
+
+        The instances are built from an idle callback on the GLib main loop,
+        a few steps at a time, so that no single iteration of the main loop
+        spends more than about `budget` seconds on them. `priority` is the
+        priority of the idle source (``GLib.PRIORITY_LOW`` by default).
+
+        Finished instances are stocked in the class's pool, so that they can
+        be fetched without building anything::
+
+            >>> builder.prebuild('draft-email-view', count=2)
+            >>> # ... later, when the user asks for it:
+            >>> view = builder['draft-email-view'].pool().acquire()
+
+        Returns a `_prebuild.Prebuild`, whose ``cancel`` method stops any
+        further building.
+        """
+        return _prebuild.Prebuild(self[ident], count, budget, priority)
+
     def _from_root(self, elt):
         _check.interface(elt)
         self._do_interface(elt)
 
+    def _to_records(self):
+        """Return a json-compatible description of the builder's classes.
+
+        `_from_records` recreates the classes from the result, without having
+        to parse or convert anything; this is used by the on-disk cache. The
+        description is made from the definitions of the classes, so it
+        doesn't generate any which haven't been already.
+        """
+        records = []
+        for ident in self._ids:
+            definition = self._definition(ident)
+            records.append({
+                'id': ident,
+                'class': _convert.class_name(definition['parent_class']),
+                'properties': [prop._to_record()
+                               for prop in definition['properties']],
+                'signals': definition['signals'],
+                'children': definition['children'],
+                'child_properties': [prop._to_record()
+                                     for prop in
+                                     definition['child_properties']],
+                'columns': definition['columns'],
+                'rows': [[indexes, [_convert.encode(value)
+                                    for value in values]]
+                         for indexes, values in definition['rows']],
+            })
+        return records
+
+    def _from_records(self, records):
+        """Declare the classes described by `records` (see `_to_records`).
+
+        The records are decoded and checked straight away, so that a bad one
+        raises here (and the cache entry it came from can be discarded),
+        rather than when its class is generated.
+        """
+        definitions = []
+        for record in records:
+            missing = _RECORD_KEYS.difference(record)
+            if missing:
+                raise KeyError("Record is missing keys: %r" % list(missing))
+            definitions.append((record['id'], _decode_record(record)))
+        idents = set(ident for ident, _ in definitions)
+        for ident, definition in definitions:
+            for name in _referenced_ids(definition):
+                if name not in idents:
+                    raise KeyError("Record %r refers to unknown id %r" %
+                                   (ident, name))
+        child_ids = set()
+        for _, definition in definitions:
+            child_ids.update(definition['children'])
+        for ident, definition in definitions:
+            self._declare(ident, functools.partial(dict, definition),
+                          child=ident in child_ids)
+
     def _do_interface(self, elt):
         for xml_child in elt.findall('./object'):
-            self._do_object(xml_child)
+            self._declare_object(xml_child)
 
-    def _do_object(self, elt):
-        module_name, class_name = namespace_split(elt.attrib['class'])
-        module = importlib.import_module('gi.repository.' + module_name)
-        parent_class = getattr(module, class_name)
-        ident = elt.attrib['id']
+    def _declare_object(self, elt, container=None, packing=None):
+        """Declare the class for `elt`, and those of its descendants.
+
+        `container` is the ``<object>`` element whose ``<child>`` `elt` is, if
+        any, and `packing` is the corresponding ``<packing>`` element.
+        """
+        self._declare(elt.attrib['id'],
+                      functools.partial(self._describe_object, elt,
+                                        container=container,
+                                        packing=packing),
+                      child=container is not None)
+        for xml_child in _child_elements(elt):
+            self._declare_object(xml_child.find('./object'),
+                                 container=elt,
+                                 packing=xml_child.find('./packing'))
+
+    def _describe_object(self, elt, container=None, packing=None):
+        """Return the definition of the class for `elt`; see `_definition`."""
+        parent_class = _class_for(elt)
 
         properties = []
         signals = {}
         children = []
+        child_properties = []
 
         for xml_child in elt.findall('./property'):
-            properties.append(Property(xml_child))
+            pspec = _convert.find_property(parent_class,
+                                           xml_child.attrib['name'])
+            properties.append(Property.from_element(xml_child, pspec))
         for xml_child in elt.findall('./signal'):
             signals[xml_child.attrib['name']] = xml_child.attrib['handler']
-        for xml_child in elt.findall('./child'):
-            if 'internal-child' in xml_child.attrib:
-                # (ISD): It's really unclear to me what internal children are
-                # supposed to do; it seems to be wrapped up with the
-                # Gtk.Buildable interface, and I don't know that we can really
-                # make use of them.  For now we just skip them entirely.
-                continue
-            self._do_child(elt=xml_child,
-                           children=children)
-
-        def _result_init(_obj_self, _objects=None):
-            parent_class.__init__(_obj_self)
-            BuiltObject.__init__(_obj_self, _builder=self, _objects=_objects)
-
-        self[ident] = type(ident, (parent_class, BuiltObject), {
+        for xml_child in _child_elements(elt):
+            children.append(xml_child.find('./object').attrib['id'])
+        if packing is not None:
+            container_class = _class_for(container)
+            for xml_child in packing.findall('./property'):
+                pspec = _convert.find_child_property(container_class,
+                                                     xml_child.attrib['name'])
+                child_properties.append(Property.from_element(xml_child,
+                                                              pspec))
+        columns, rows = _model.from_element(elt)
+
+        return {
+            'parent_class': parent_class,
+            'properties': properties,
+            'signals': signals,
+            'children': children,
+            'child_properties': child_properties,
+            'columns': columns,
+            'rows': rows,
+        }
+
+    def _define(self, ident, parent_class, properties, signals, children,
+                child_properties=(), columns=None, rows=()):
+        """Generate the class `ident` and add it to the builder.
+
+        This is the last step of processing an ``<object>`` element; it is
+        also called directly by modules generated by `gtkclassbuilder.compile`,
+        with `properties` and `child_properties` already converted.
+
+        `columns` and `rows` describe the contents of list and tree stores,
+        as returned by `_model.from_element`.
+        """
+        # _properties is the complete table, as declared in the glade file.
+        # _instance_properties are those which must be set after the object
+        # has been constructed.
+        construct_properties = {}
+        instance_properties = list(properties)
+        if self.construct_properties and _init_takes_properties(parent_class):
+            instance_properties = []
+            for prop in properties:
+                if prop.reference or isinstance(prop.value, _images.Image):
+                    instance_properties.append(prop)
+                else:
+                    construct_properties[prop.key.replace('-', '_')] = \
+                        prop.value
+
+        column_types = None
+        prepared_rows = []
+        if columns is not None:
+            column_types = _model.column_types(columns)
+            prepared_rows = _model.prepare(column_types, rows)
+
+        def _result_init(_obj_self):
+            parent_class.__init__(_obj_self, **construct_properties)
+            BuiltObject.__init__(_obj_self)
+
+        cls = type(ident, (parent_class, BuiltObject), {
             '__init__': _result_init,
-            '_properties': properties,
+            '_builder': self,
+            '_ident': ident,
+            '_parent_class': parent_class,
+            '_construct_properties': construct_properties,
+            '_properties': list(properties),
+            '_instance_properties': instance_properties,
             '_signals': signals,
-            '_children': children,
-            '_child_properties': [],
+            '_children': list(children),
+            '_child_properties': list(child_properties),
+            '_columns': columns,
+            '_rows': list(rows),
+            '_column_types': column_types,
+            '_prepared_rows': prepared_rows,
         })
+        if ident not in self:
+            self._ids.append(ident)
+        self._child_ids.update(children)
+        dict.__setitem__(self, ident, cls)
 
-    def _do_child(self, elt, children):
-        obj_elt = elt.find('./object')
-        packing_elt = elt.find('./packing')
 
-        self._do_object(obj_elt)
+def _decode_record(record):
+    """Return the definition of the class described by `record`.
 
-        child_properties = []
-        if packing_elt is not None:
-            for xml_child in packing_elt.findall('./property'):
-                child_properties.append(Property(xml_child))
-
-        child_class_name = obj_elt.attrib["id"]
-        child = self[child_class_name]
-        child._child_properties = child_properties
-        children.append(child_class_name)
+    Raises an exception if any part of the record can't be decoded.
+    """
+    columns = record['columns']
+    if columns is not None:
+        _model.column_types(columns)
+    return {
+        'parent_class': _convert.class_by_name(record['class']),
+        'properties': [Property._from_record(prop)
+                       for prop in record['properties']],
+        'signals': dict(record['signals']),
+        'children': list(record['children']),
+        'child_properties': [Property._from_record(prop)
+                             for prop in record['child_properties']],
+        'columns': columns,
+        'rows': [(indexes, [_convert.decode(value) for value in values])
+                 for indexes, values in record['rows']],
+    }
+
+
+def _referenced_ids(definition):
+    """Return the ids of the other classes which `definition` refers to."""
+    result = list(definition['children'])
+    for prop in definition['properties'] + definition['child_properties']:
+        if prop.reference:
+            result.append(prop.value)
+    return result
+
+
+def _init_takes_properties(cls):
+    """Return whether the constructor of `cls` takes properties by keyword."""
+    for klass in cls.__mro__:
+        if '__init__' in klass.__dict__:
+            return _convert.class_name(klass) not in _POSITIONAL_INIT
+    return True
+
+
+def _class_for(elt):
+    """Return the Gtk class named by the ``class`` attribute of `elt`."""
+    return gi_class(elt.attrib['class'])
+
+
+def _child_elements(elt):
+    """Return the ``<child>`` elements of the ``<object>`` element `elt`."""
+    result = []
+    for xml_child in elt.findall('./child'):
+        if 'internal-child' in xml_child.attrib:
+            # (ISD): It's really unclear to me what internal children are
+            # supposed to do; it seems to be wrapped up with the
+            # Gtk.Buildable interface, and I don't know that we can really
+            # make use of them.  For now we just skip them entirely.
+            continue
+        result.append(xml_child)
+    return result
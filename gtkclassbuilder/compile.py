@@ -0,0 +1,246 @@
+"""Ahead-of-time compilation of ``.glade`` files to python modules.
+
+Processing a glade file at run time means parsing the xml, validating it and
+converting every property value each time the program starts. This module
+does that work once, and writes out python source which defines the same
+classes with everything already resolved. Importing the generated module
+costs about as much as importing any other python module.
+
+Usage::
+
+    python -m gtkclassbuilder.compile foo.glade -o foo_ui.py
+
+Image files named by properties are looked for relative to the directory of
+the generated module, so it should be written next to the glade file.
+
+The generated module has an attribute ``builder``, which is the `Builder`
+that `from_filename` would have returned (with the same options), as well as
+an attribute for each class whose id is a valid python identifier::
+
+    >>> from foo_ui import MainWindow
+    >>> from foo_ui import builder
+    >>> builder['some-other-id']
+"""
+from . import _from_bytes
+from ._utils import gi_module
+
+import argparse
+import keyword
+import os
+import re
+import sys
+
+
+_IDENTIFIER = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
+
+HEADER = '''\
+# Generated by gtkclassbuilder.compile from %(source)s; do not edit.
+from gtkclassbuilder._images import Image
+from gtkclassbuilder.builder import Builder, Property
+%(imports)s
+
+builder = Builder(construct_properties=%(construct_properties)r,
+                  lazy=%(lazy)r,
+                  freeze_notify=%(freeze_notify)r,
+                  shared=%(shared)r,
+                  source=%(source)r,
+                  backend=%(backend)r%(directory)s)
+'''
+
+# Added after the classes, if the builder uses composite templates.
+INSTALL_TEMPLATES = '''
+builder._install_templates()
+'''
+
+# Passed to the generated module's Builder if any images need to be found.
+DIRECTORY = ''',
+                  directory=os.path.dirname(os.path.abspath(__file__))'''
+
+
+def _namespace(cls):
+    """Return the gi namespace (e.g. ``Gtk``) defining `cls`."""
+    return cls.__module__.rsplit('.', 1)[-1]
+
+
+def value_source(value, namespaces):
+    """Return a python expression which evaluates to `value`.
+
+    `namespaces` is a set, to which the names of any gi namespaces referred
+    to by the expression are added (and ``os``, if the expression names an
+    image relative to the generated module).
+    """
+    if value is None or isinstance(value, (bool, float, str)):
+        return repr(value)
+    GObject = gi_module('GObject')
+    if isinstance(value, (GObject.GEnum, GObject.GFlags)):
+        cls = type(value)
+        namespaces.add(_namespace(cls))
+        return '%s.%s(%d)' % (_namespace(cls), cls.__name__, int(value))
+    if isinstance(value, int):
+        return repr(value)
+    if isinstance(value, GObject.GType):
+        namespaces.add('GObject')
+        return 'GObject.type_from_name(%r)' % value.name
+    type_name = type(value).__name__
+    if type_name == 'RGBA':
+        namespaces.add('Gdk')
+        return 'Gdk.RGBA(red=%r, green=%r, blue=%r, alpha=%r)' % (
+            value.red, value.green, value.blue, value.alpha)
+    if type_name == 'Color':
+        namespaces.add('Gdk')
+        return 'Gdk.Color(%r, %r, %r)' % (value.red, value.green, value.blue)
+    if type_name == 'Image':
+        if not value.resource and not os.path.isabs(value.source):
+            namespaces.add('os')
+        return repr(value)
+    raise ValueError("Can't generate source for value %r" % (value,))
+
+
+def property_source(prop, namespaces):
+    """Return a python expression which constructs the `Property` `prop`."""
+    if prop.reference:
+        return 'Property(%r, %r, reference=True)' % (prop.key, prop.value)
+    return 'Property(%r, %s)' % (prop.key,
+                                 value_source(prop.value, namespaces))
+
+
+def _list_source(props, namespaces):
+    if not props:
+        return '[]'
+    items = ''.join('\n        %s,' % property_source(prop, namespaces)
+                    for prop in props)
+    return '[%s\n    ]' % items
+
+
+def _rows_source(rows, namespaces):
+    if not rows:
+        return '[]'
+    items = ''.join('\n        (%r, [%s]),' % (
+        indexes, ', '.join(value_source(value, namespaces)
+                           for value in values))
+        for indexes, values in rows)
+    return '[%s\n    ]' % items
+
+
+def _model_source(cls, namespaces):
+    """Return the arguments to ``_define`` describing a store's contents."""
+    if cls._columns is None:
+        return ''
+    return '    columns=%r,\n    rows=%s,\n' % (
+        cls._columns, _rows_source(cls._rows, namespaces))
+
+
+def generate(builder, source='<string>'):
+    """Return python source defining the classes in `builder`.
+
+    The generated module's builder is created with the same options as
+    `builder`. `source` is the name of the glade file, for use in a comment
+    and as the builder's ``source``.
+    """
+    namespaces = set()
+    definitions = []
+    for ident, cls in builder.items():
+        parent_class = cls._parent_class
+        namespaces.add(_namespace(parent_class))
+        definitions.append(
+            '\nbuilder._define(\n'
+            '    %r,\n'
+            '    %s.%s,\n'
+            '    properties=%s,\n'
+            '    signals=%r,\n'
+            '    children=%r,\n'
+            '    child_properties=%s,\n'
+            '%s'
+            ')\n' % (ident,
+                     _namespace(parent_class), parent_class.__name__,
+                     _list_source(cls._properties, namespaces),
+                     cls._signals,
+                     cls._children,
+                     _list_source(cls._child_properties, namespaces),
+                     _model_source(cls, namespaces)))
+
+    names = [ident for ident in builder
+             if _IDENTIFIER.match(ident) and not keyword.iskeyword(ident) and
+             ident != 'builder']
+    exports = ''.join('%s = builder[%r]\n' % (ident, ident)
+                      for ident in names)
+    directory = ''
+    if 'os' in namespaces:
+        namespaces.remove('os')
+        directory = DIRECTORY
+    imports = '\n'.join('from gi.repository import %s' % namespace
+                        for namespace in sorted(namespaces))
+    if directory:
+        imports += '\nimport os'
+    header = HEADER % {
+        'source': source,
+        'imports': imports,
+        'construct_properties': builder.construct_properties,
+        'lazy': sorted(builder.lazy),
+        'freeze_notify': builder.freeze_notify,
+        'shared': sorted(builder.shared),
+        'backend': builder.backend,
+        'directory': directory,
+    }
+    if builder.backend == 'template':
+        definitions.append(INSTALL_TEMPLATES)
+    return header + ''.join(definitions) + '\n' + exports
+
+
+def compile_file(filename, output, **options):
+    """Compile the glade file `filename`, writing python source to `output`.
+
+    `output` is a file-like object. Keyword arguments are passed on to
+    `Builder`. Unlike `from_filename`, this neither reads nor fills the
+    on-disk cache or the registry.
+    """
+    with open(filename, 'rb') as f:
+        contents = f.read()
+    options.setdefault('directory',
+                       os.path.dirname(os.path.abspath(filename)))
+    builder = _from_bytes(contents, **options)
+    output.write(generate(builder, source=filename))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m gtkclassbuilder.compile',
+        description='Compile a glade file to a python module.')
+    parser.add_argument('filename', help='the .glade file to compile')
+    parser.add_argument('-o', '--output',
+                        help='file to write the module to (default: stdout)')
+    parser.add_argument('--construct-properties', action='store_true',
+                        help='pass properties to the Gtk constructor; '
+                        'see Builder')
+    parser.add_argument('--lazy', action='append', default=[],
+                        metavar='ID_OR_CLASS',
+                        help='defer building the children of these '
+                        'containers; may be repeated (see Builder)')
+    parser.add_argument('--shared', action='append', default=[],
+                        metavar='ID',
+                        help='share this object between instances; may be '
+                        'repeated (see Builder)')
+    parser.add_argument('--no-freeze-notify', dest='freeze_notify',
+                        action='store_false',
+                        help="don't freeze notifications while building "
+                        "instances (see Builder)")
+    parser.add_argument('--backend', choices=['python', 'template'],
+                        default='python',
+                        help='how instances are built (see Builder)')
+    args = parser.parse_args(argv)
+    options = {
+        'construct_properties': args.construct_properties,
+        'lazy': args.lazy,
+        'shared': args.shared,
+        'freeze_notify': args.freeze_notify,
+        'backend': args.backend,
+    }
+    if args.output is None:
+        compile_file(args.filename, sys.stdout, **options)
+    else:
+        with open(args.output, 'w') as output:
+            compile_file(args.filename, output, **options)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+import gtkclassbuilder
+from gtkclassbuilder import _stream, from_filename, from_filename_async
+from gtkclassbuilder._check import BadInput
+from gi.repository import GLib, Gtk
+from os import path
+import asyncio
+import os
+import tempfile
+import threading
+
+gladefile = path.join(path.dirname(__file__), '..',
+                      'examples', 'hello', 'hello.glade')
+
+main_thread = threading.current_thread()
+
+# With a callback, the result arrives from the GLib main loop.
+gtkclassbuilder.registry.clear()
+loop = GLib.MainLoop()
+done = []
+
+
+def on_loaded(future):
+    loop.quit()
+    assert threading.current_thread() is main_thread
+    done.append(future)
+
+
+from_filename_async(gladefile, callback=on_loaded)
+loop.run()
+builder = done[0].result()
+w = builder['MainWindow']()
+assert w.get_object('box1').get_orientation() == Gtk.Orientation.VERTICAL
+
+# The result is registered like that of from_filename.
+assert from_filename(gladefile) is builder
+
+
+# The future can also be awaited from a coroutine.
+async def load():
+    return await from_filename_async(gladefile)
+
+
+gtkclassbuilder.registry.clear()
+awaited = asyncio.run(load())
+assert 'MainWindow' in awaited
+assert from_filename(gladefile) is awaited
+
+
+# Errors are raised by the future.
+async def load_bad():
+    fd, name = tempfile.mkstemp(suffix='.glade')
+    with os.fdopen(fd, 'w') as f:
+        f.write('<interface><object class="GtkWindow"/></interface>')
+    try:
+        await from_filename_async(name)
+    finally:
+        os.remove(name)
+
+
+try:
+    asyncio.run(load_bad())
+except BadInput:
+    pass
+else:
+    assert False, 'Expected BadInput'
+
+
+# The file is parsed once, in the worker thread, and GI classes are only
+# looked up from the calling thread.
+threads = []
+parse_threads = []
+gi_class = _stream.gi_class
+parse = _stream.parse
+
+
+def recording_gi_class(name):
+    threads.append(threading.current_thread())
+    return gi_class(name)
+
+
+def recording_parse(*args, **kwargs):
+    parse_threads.append(threading.current_thread())
+    return parse(*args, **kwargs)
+
+
+_stream.gi_class = recording_gi_class
+_stream.parse = recording_parse
+gtkclassbuilder.configure_cache(enabled=False)
+try:
+    gtkclassbuilder.registry.clear()
+    asyncio.run(load())
+finally:
+    _stream.gi_class = gi_class
+    _stream.parse = parse
+    gtkclassbuilder.configure_cache()
+assert threads and all(t is main_thread for t in threads), threads
+assert len(parse_threads) == 1 and parse_threads[0] is not main_thread, \
+    parse_threads
@@ -0,0 +1,40 @@
+from gtkclassbuilder import batch
+from os import path
+import os
+import shutil
+import tempfile
+
+gladefile = path.join(path.dirname(__file__), '..',
+                      'examples', 'hello', 'hello.glade')
+
+directory = tempfile.mkdtemp()
+try:
+    shutil.copy(gladefile, path.join(directory, 'hello.glade'))
+    os.mkdir(path.join(directory, 'sub'))
+    with open(path.join(directory, 'sub', 'bad.glade'), 'w') as f:
+        f.write('<interface><object class="GtkWindow"/></interface>')
+
+    # A failing file is reported without stopping the others.
+    results = dict((path.basename(result.filename), result)
+                   for result in batch.run([directory], jobs=2))
+    assert results['hello.glade'].status == 'compiled'
+    assert results['bad.glade'].status == 'failed'
+    assert 'BadInput' in results['bad.glade'].error
+    module = {}
+    with open(path.join(directory, 'hello_ui.py')) as f:
+        exec(compile(f.read(), 'hello_ui.py', 'exec'), module)
+    assert 'MainWindow' in module
+
+    # Unchanged files are skipped the next time; failed ones are retried.
+    results = dict((path.basename(result.filename), result.status)
+                   for result in batch.run([directory], jobs=1))
+    assert results == {'hello.glade': 'unchanged', 'bad.glade': 'failed'}
+
+    with open(path.join(directory, 'hello.glade'), 'a') as f:
+        f.write('\n')
+    statuses = [result.status for result in batch.run([directory], jobs=1)]
+    assert statuses.count('compiled') == 1
+
+    assert batch.main([directory, '-j', '1']) == 1
+finally:
+    shutil.rmtree(directory)
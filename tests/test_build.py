@@ -1,5 +1,7 @@
 from gtkclassbuilder import from_string
 from gi.repository import Gtk
+import gc
+import weakref
 
 input = """<?xml version="1.0" encoding="UTF-8"?>
 <!-- Generated with glade 3.18.3 -->
@@ -46,6 +48,12 @@ input = """<?xml version="1.0" encoding="UTF-8"?>
 """
 
 classes = from_string(input)
+
+# Classes are only generated when they are needed.
+assert sorted(classes.keys()) == ['MainWindow', 'box1', 'button1', 'label1']
+assert 'label1' in classes
+assert len(dict.keys(classes)) == 0
+
 w = classes['MainWindow']()
 
 assert isinstance(w, Gtk.Window)
@@ -56,3 +64,66 @@ w2 = classes['MainWindow']()
 
 assert w is not w2
 assert w.get_object('box1') is not w2.get_object('box1')
+
+# Property values are converted according to the type of the property.
+assert w.get_object('box1').get_orientation() == Gtk.Orientation.VERTICAL
+assert w.get_object('button1').get_relief() == Gtk.ReliefStyle.NONE
+assert w.get_object('label1').get_visible() is True
+
+# Passing properties to the constructor gives the same result.
+fast = from_string(input, construct_properties=True)['MainWindow']()
+assert fast.get_object('box1').get_orientation() == Gtk.Orientation.VERTICAL
+assert fast.get_object('label1').get_label() == 'Hello, World!'
+
+# ...except for classes whose constructors take other arguments, whose
+# properties are set one at a time.
+others = from_string("""<interface>
+  <object class="GtkListStore" id="store">
+    <columns>
+      <column type="gchararray"/>
+    </columns>
+    <data>
+      <row>
+        <col id="0">One</col>
+      </row>
+    </data>
+  </object>
+  <object class="GtkTreeViewColumn" id="column">
+    <property name="title" translatable="yes">Name</property>
+    <property name="sizing">fixed</property>
+  </object>
+</interface>""", construct_properties=True)
+assert [list(row) for row in others['store']()] == [['One']]
+column = others['column']()
+assert column.get_title() == 'Name'
+assert column.get_sizing() == Gtk.TreeViewColumnSizing.FIXED
+
+# Signals of all descendants are connected.
+clicked = []
+w.connect_signals({'goodbye': lambda *args: clicked.append(args)})
+w.get_object('button1').clicked()
+assert len(clicked) == 1
+
+# Connecting the signals of another object connects those of its subtree.
+w3 = classes['MainWindow']()
+clicked = []
+w3.get_object('box1').connect_signals(
+    {'goodbye': lambda *args: clicked.append(args)})
+w3.get_object('button1').clicked()
+assert clicked == [(w3.get_object('button1'),)]
+
+# ...and recycling it restores the properties of its subtree.
+w3.get_object('label1').set_label('Changed')
+w3.get_object('box1')._recycle()
+assert w3.get_object('label1').get_label() == 'Hello, World!'
+
+# Destroying an instance releases all of its objects, without waiting for
+# the cycle collector.
+gc.disable()
+try:
+    label = weakref.ref(w2.get_object('label1'))
+    w2.destroy()
+    del w2
+    assert label() is None
+finally:
+    gc.enable()
@@ -0,0 +1,63 @@
+import gtkclassbuilder
+from gtkclassbuilder import _cache
+from gi.repository import Gtk
+from os import path
+import json
+import os
+import shutil
+import tempfile
+
+gladefile = path.join(path.dirname(__file__), '..',
+                      'examples', 'hello', 'hello.glade')
+
+cache_dir = tempfile.mkdtemp()
+try:
+    gtkclassbuilder.configure_cache(directory=cache_dir)
+    _cache.reset_stats()
+
+    # The first load misses and fills the cache; the second hits. The
+    # registry is cleared so that each load goes to the cache.
+    gtkclassbuilder.registry.clear()
+    cold = gtkclassbuilder.from_filename(gladefile)
+    assert gtkclassbuilder.cache_stats()['misses'] == 1
+    assert gtkclassbuilder.cache_stats()['writes'] == 1
+    # Filling the cache doesn't generate any classes.
+    assert not dict.keys(cold)
+    gtkclassbuilder.registry.clear()
+    warm = gtkclassbuilder.from_filename(gladefile)
+    assert gtkclassbuilder.cache_stats()['hits'] == 1
+
+    assert sorted(cold.keys()) == sorted(warm.keys())
+    w = warm['MainWindow']()
+    assert w.get_object('box1').get_orientation() == Gtk.Orientation.VERTICAL
+    assert w.get_object('button1').get_relief() == Gtk.ReliefStyle.NONE
+
+    # Corrupt entries are discarded and rebuilt.
+    for name in os.listdir(cache_dir):
+        with open(path.join(cache_dir, name), 'w') as f:
+            f.write('{not json')
+    gtkclassbuilder.registry.clear()
+    gtkclassbuilder.from_filename(gladefile)
+    assert gtkclassbuilder.cache_stats()['errors'] == 1
+    gtkclassbuilder.registry.clear()
+    gtkclassbuilder.from_filename(gladefile)
+    assert gtkclassbuilder.cache_stats()['hits'] == 2
+
+    # So are entries which can't be decoded, such as ones naming classes
+    # which no longer exist.
+    for name in os.listdir(cache_dir):
+        with open(path.join(cache_dir, name)) as f:
+            entry = json.load(f)
+        entry['records'][0]['class'] = 'Gtk.NoSuchWidget'
+        with open(path.join(cache_dir, name), 'w') as f:
+            json.dump(entry, f)
+    gtkclassbuilder.registry.clear()
+    stale = gtkclassbuilder.from_filename(gladefile)
+    assert gtkclassbuilder.cache_stats()['errors'] == 2
+    assert stale['MainWindow']().get_object('button1') is not None
+    gtkclassbuilder.registry.clear()
+    gtkclassbuilder.from_filename(gladefile)
+    assert gtkclassbuilder.cache_stats()['hits'] == 3
+finally:
+    gtkclassbuilder.configure_cache()
+    shutil.rmtree(cache_dir)
@@ -0,0 +1,48 @@
+from gtkclassbuilder import from_filename
+from gtkclassbuilder.compile import generate
+from gi.repository import Gtk
+from os import path
+
+gladefile = path.join(path.dirname(__file__), '..',
+                      'examples', 'hello', 'hello.glade')
+
+source = generate(from_filename(gladefile), source=gladefile)
+module = {}
+exec(compile(source, '<generated>', 'exec'), module)
+
+w = module['MainWindow']()
+assert isinstance(w, Gtk.Window)
+assert w.get_object('MainWindow') is w
+assert isinstance(w.get_object('box1'), module['builder']['box1'])
+assert w.get_object('box1').get_orientation() == Gtk.Orientation.VERTICAL
+assert w.get_object('button1').get_relief() == Gtk.ReliefStyle.NONE
+
+# The generated builder has the same options as the one compiled.
+import gtkclassbuilder
+import io
+from gtkclassbuilder import from_string
+from gtkclassbuilder.compile import compile_file
+
+options = {
+    'construct_properties': True,
+    'lazy': ['GtkBox'],
+    'freeze_notify': False,
+    'shared': ['button1'],
+    'backend': 'template',
+}
+with open(gladefile) as f:
+    builder = from_string(f.read(), **options)
+module = {}
+exec(compile(generate(builder), '<generated>', 'exec'), module)
+for name, value in options.items():
+    assert getattr(module['builder'], name) == getattr(builder, name), name
+assert module['MainWindow']().get_object('button1').get_label() == 'Goodbye'
+
+# Compiling a file doesn't fill the registry or the on-disk cache.
+gtkclassbuilder.registry.clear()
+writes = gtkclassbuilder.cache_stats()['writes']
+output = io.StringIO()
+compile_file(gladefile, output, lazy=['GtkBox'])
+assert "lazy=['GtkBox']" in output.getvalue()
+assert len(gtkclassbuilder.registry) == 0
+assert gtkclassbuilder.cache_stats()['writes'] == writes
@@ -0,0 +1,18 @@
+from gtkclassbuilder import from_filename
+from gi.repository import GdkPixbuf, Gtk
+from os import path
+
+examples = path.join(path.dirname(__file__), '..', 'examples')
+
+# The EmailView's attachments are shown from a store whose icon column has
+# empty cells, which are left unset.
+classes = from_filename(path.join(examples, 'EmailView',
+                                  'draft-email-view.glade'))
+assert classes['attachment_list']._rows == [([1], ['Icon1']),
+                                            ([1], ['Icon2'])]
+view = classes['draft-email-view']()
+assert isinstance(view, Gtk.Window)
+model = view.get_object('attachments').get_model()
+assert model.get_column_type(0) == GdkPixbuf.Pixbuf.__gtype__
+assert [list(row) for row in model] == [[None, 'Icon1'], [None, 'Icon2']]
+
@@ -0,0 +1,40 @@
+from gtkclassbuilder import NotifyCounter, from_string
+
+input = """<interface>
+  <object class="GtkBox" id="Root">
+    <property name="visible">True</property>
+    <child>
+      <object class="GtkLabel" id="label">
+        <property name="visible">True</property>
+        <property name="label">Hello</property>
+        <property name="xalign">0</property>
+      </object>
+    </child>
+  </object>
+</interface>"""
+
+
+def notifications(**options):
+    cls = from_string(input, **options)['Root']
+    with NotifyCounter() as counter:
+        w = cls()
+    assert w.get_object('label').get_label() == 'Hello'
+    return counter.count
+
+frozen = notifications()
+assert 0 < frozen <= notifications(freeze_notify=False)
+
+# While frozen, each changed property is notified once, however many times
+# it is set.
+input = input.replace('<property name="label">Hello</property>',
+                      '<property name="label">Goodbye</property>'
+                      '<property name="label">Hello</property>')
+assert notifications() == frozen
+assert notifications(freeze_notify=False) > frozen
+
+# Outside of the with block, nothing is counted.
+counter = NotifyCounter()
+with counter:
+    pass
+from_string(input)['Root']()
+assert counter.count == 0
@@ -0,0 +1,46 @@
+import gtkclassbuilder
+from gtkclassbuilder import from_filename, image_cache
+from gi.repository import GdkPixbuf
+import os
+import shutil
+import tempfile
+
+input = """<interface>
+  <object class="GtkImage" id="Avatar">
+    <property name="file">avatar.png</property>
+  </object>
+  <object class="GtkImage" id="Missing">
+    <property name="file">missing.png</property>
+  </object>
+</interface>"""
+
+directory = tempfile.mkdtemp()
+try:
+    GdkPixbuf.Pixbuf.new(GdkPixbuf.Colorspace.RGB, False, 8, 4, 4).savev(
+        os.path.join(directory, 'avatar.png'), 'png', [], [])
+    gladefile = os.path.join(directory, 'avatars.glade')
+    with open(gladefile, 'w') as f:
+        f.write(input)
+
+    # Images are found relative to the glade file, and decoded once.
+    image_cache.clear()
+    before = image_cache.stats()
+    Avatar = from_filename(gladefile)['Avatar']
+    avatars = Avatar.instantiate_many(3)
+    pixbufs = set(avatar.get_pixbuf() for avatar in avatars)
+    assert len(pixbufs) == 1 and None not in pixbufs
+    stats = image_cache.stats()
+    assert stats['misses'] - before['misses'] == 1
+    assert stats['hits'] - before['hits'] == 2
+    assert stats['size'] == 1 and stats['bytes'] > 0
+
+    # Images which can't be loaded are left to the widget.
+    from_filename(gladefile)['Missing']()
+    assert image_cache.stats()['size'] == 1
+
+    image_cache.clear()
+    assert len(image_cache) == 0
+    assert image_cache.stats()['bytes'] == 0
+finally:
+    gtkclassbuilder.registry.clear()
+    shutil.rmtree(directory)
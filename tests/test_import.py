@@ -0,0 +1,43 @@
+from os import path
+import subprocess
+import sys
+
+# Importing the package, and validating a document, must not import any gi
+# namespace (in particular Gtk), and must stay fast.
+script = """
+import time
+start = time.perf_counter()
+import gtkclassbuilder
+elapsed = time.perf_counter() - start
+
+import sys
+import xml.etree.ElementTree as ET
+from gtkclassbuilder import _check
+_check.interface(ET.fromstring(
+    '<interface><object class="GtkWindow" id="w"/></interface>'))
+print(elapsed)
+print(' '.join(name for name in sys.modules if name.startswith('gi')))
+"""
+
+# The time budget for importing the package, in seconds.
+BUDGET = 0.5
+
+output = subprocess.check_output([sys.executable, '-c', script],
+                                 cwd=path.join(path.dirname(__file__), '..'),
+                                 universal_newlines=True).split('\n')
+assert float(output[0]) < BUDGET, output[0]
+assert output[1] == '', output[1]
+
+# Starting an asynchronous load outside of an asyncio loop doesn't import
+# asyncio either.
+script = """
+import sys
+from gtkclassbuilder import _async
+_async.run(lambda: None, lambda result: result)
+print('asyncio' in sys.modules)
+"""
+
+output = subprocess.check_output([sys.executable, '-c', script],
+                                 cwd=path.join(path.dirname(__file__), '..'),
+                                 universal_newlines=True)
+assert output.strip() == 'False', output
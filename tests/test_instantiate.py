@@ -0,0 +1,48 @@
+from gtkclassbuilder import from_string
+from gi.repository import Gtk
+
+input = """<interface>
+  <object class="GtkBox" id="MessageRow">
+    <property name="visible">True</property>
+    <child>
+      <object class="GtkLabel" id="subject">
+        <property name="label">No subject</property>
+      </object>
+    </child>
+  </object>
+</interface>"""
+
+MessageRow = from_string(input)['MessageRow']
+
+subjects = ['Message %d' % n for n in range(10)]
+
+
+def init(row, objects):
+    objects['subject'].set_label(subjects[len(rows)])
+    rows.append(row)
+
+rows = []
+result = MessageRow.instantiate_many(len(subjects), init=init)
+assert result == rows
+assert len(set(map(id, rows))) == len(subjects)
+for row, subject in zip(rows, subjects):
+    assert isinstance(row, MessageRow)
+    assert row.get_object('MessageRow') is row
+    assert row.get_object('subject').get_label() == subject
+    assert row.get_object('subject').get_parent() is row
+
+rows = []
+chunks = list(MessageRow.instantiate_chunks(len(subjects), 4, init=init))
+assert [len(chunk) for chunk in chunks] == [4, 4, 2]
+assert sum(chunks, []) == rows
+assert MessageRow.instantiate_many(0) == []
+
+
+class Subclass(MessageRow):
+
+    def __init__(self):
+        MessageRow.__init__(self)
+        self.initialized = True
+
+assert all(row.initialized for row in Subclass.instantiate_many(3))
+assert isinstance(Subclass.instantiate_many(1)[0], Gtk.Box)
@@ -0,0 +1,62 @@
+from gtkclassbuilder import from_string, instrumentation
+import gc
+
+input = """<interface>
+  <object class="GtkWindow" id="Stats">
+    <property name="title">Stats</property>
+    <child>
+      <object class="GtkButton" id="button">
+        <property name="label">Click</property>
+        <signal name="clicked" handler="on_click" swapped="no"/>
+      </object>
+    </child>
+  </object>
+</interface>"""
+
+events = []
+
+
+def hook(event, phase, name, seconds):
+    events.append((event, phase, name))
+
+
+instrumentation.clear()
+instrumentation.add_hook(hook)
+instrumentation.enable()
+try:
+    builder = from_string(input)
+    cls = builder['Stats']
+    w = cls()
+    w.connect_signals({'on_click': lambda button: None})
+    other = cls.instantiate_many(2)
+finally:
+    instrumentation.disable()
+    instrumentation.remove_hook(hook)
+
+assert events[:2] == [('begin', 'parse', '<string>'),
+                      ('end', 'parse', '<string>')]
+assert ('end', 'generate', 'Stats') in events
+assert ('end', 'build', 'Stats') in events
+assert ('end', 'connect', 'Stats') in events
+
+stats = instrumentation.class_stats()[cls]
+assert stats['instances'] == 3
+assert stats['live'] == 3
+assert stats['signals'] == 1
+# The title, the button's label, and adding the button.
+assert stats['properties'] == 3 * 2
+assert stats['children'] == 3
+assert stats['build_p50'] is not None
+assert stats['build_time'] >= stats['build_p99'] > 0
+assert instrumentation.file_stats()['<string>']['loads'] == 1
+
+for obj in other + [w]:
+    obj.destroy()
+del obj, other, w
+gc.collect()
+assert instrumentation.class_stats()[cls]['live'] == 0
+
+# Nothing is recorded while disabled.
+cls()
+assert instrumentation.class_stats()[cls]['instances'] == 3
+instrumentation.clear()
@@ -0,0 +1,42 @@
+from gtkclassbuilder import from_string
+
+input = """<interface>
+  <object class="GtkNotebook" id="Pages">
+    <child>
+      <object class="GtkLabel" id="first">
+        <property name="visible">True</property>
+        <property name="label">First page</property>
+      </object>
+    </child>
+    <child>
+      <object class="GtkBox" id="second">
+        <property name="visible">True</property>
+        <child>
+          <object class="GtkButton" id="button">
+            <property name="label">Press me</property>
+            <signal name="clicked" handler="pressed"/>
+          </object>
+        </child>
+      </object>
+    </child>
+  </object>
+</interface>
+"""
+
+for lazy in (['GtkNotebook'], ['Pages']):
+    notebook = from_string(input, lazy=lazy)['Pages']()
+    assert notebook.get_n_pages() == 2
+
+    # Pages start out as empty placeholders.
+    placeholder = notebook.get_nth_page(1)
+    assert placeholder.get_children() == []
+
+    pressed = []
+    notebook.connect_signals({'pressed': lambda *args: pressed.append(args)})
+
+    # Asking for an object inside a page builds the page.
+    button = notebook.get_object('button')
+    assert placeholder.get_children() == [notebook.get_object('second')]
+    assert button.get_label() == 'Press me'
+    button.clicked()
+    assert len(pressed) == 1
@@ -0,0 +1,54 @@
+from gtkclassbuilder import from_string, load_rows
+from gtkclassbuilder.compile import generate
+from gi.repository import Gtk
+
+input = """<interface>
+  <object class="GtkListStore" id="choices">
+    <columns>
+      <!-- column-name label -->
+      <column type="gchararray"/>
+      <!-- column-name count -->
+      <column type="gint"/>
+      <!-- column-name enabled -->
+      <column type="gboolean"/>
+    </columns>
+    <data>
+      <row>
+        <col id="0" translatable="yes">One</col>
+        <col id="1">1</col>
+        <col id="2">True</col>
+      </row>
+      <row>
+        <col id="0" translatable="yes">Two</col>
+        <col id="1">2</col>
+        <col id="2">False</col>
+      </row>
+    </data>
+  </object>
+</interface>"""
+
+classes = from_string(input)
+choices = classes['choices']
+assert choices._columns == ['gchararray', 'gint', 'gboolean']
+assert choices._rows == [([0, 1, 2], ['One', 1, True]),
+                         ([0, 1, 2], ['Two', 2, False])]
+
+store = choices()
+assert store.get_n_columns() == 3
+assert [list(row) for row in store] == [['One', 1, True], ['Two', 2, False]]
+
+# Rows from elsewhere are loaded in bulk.
+load_rows(store, [('Three', 3, True), ('Four', 4, False)])
+load_rows(store, [(5, 'Five')], columns=[1, 0])
+assert len(store) == 5
+assert list(store[4])[:2] == ['Five', 5]
+
+# Sorted models are left sorted.
+store.set_sort_column_id(1, Gtk.SortType.DESCENDING)
+load_rows(store, [('Zero', 0, False)])
+assert store.get_sort_column_id() == (1, Gtk.SortType.DESCENDING)
+
+# Compiled modules carry the rows too.
+source = generate(classes)
+assert "columns=['gchararray', 'gint', 'gboolean']" in source
+assert "([0, 1, 2], ['One', 1, True])" in source
@@ -0,0 +1,65 @@
+from gtkclassbuilder import from_filename, from_string
+from os import path
+
+gladefile = path.join(path.dirname(__file__), '..',
+                      'examples', 'hello', 'hello.glade')
+classes = from_filename(gladefile)
+
+pool = classes['box1'].pool(max_size=1)
+assert classes['box1'].pool() is pool
+
+box = pool.acquire()
+clicked = []
+box.connect_signals({'goodbye': lambda *args: clicked.append(args)})
+box.get_object('label1').set_label('Changed')
+
+# Released instances get their declared properties back, and lose their
+# handlers.
+pool.release(box)
+assert box.get_object('label1').get_label() == 'Hello, World!'
+box.get_object('button1').clicked()
+assert clicked == []
+
+assert pool.acquire() is box
+other = pool.acquire()
+pool.release(box)
+pool.release(other)
+assert pool.stats() == {
+    'hits': 1,
+    'misses': 2,
+    'releases': 3,
+    'evictions': 1,
+    'added': 0,
+    'idle': 1,
+}
+
+# Deferred subtrees which have been built are restored too.
+lazy_input = """<interface>
+  <object class="GtkNotebook" id="Pages">
+    <child>
+      <object class="GtkLabel" id="first">
+        <property name="visible">True</property>
+        <property name="label">First page</property>
+      </object>
+    </child>
+    <child>
+      <object class="GtkBox" id="second">
+        <property name="visible">True</property>
+        <child>
+          <object class="GtkButton" id="button">
+            <property name="label">Press me</property>
+          </object>
+        </child>
+      </object>
+    </child>
+  </object>
+</interface>
+"""
+
+lazy_pool = from_string(lazy_input, lazy=['second'])['Pages'].pool()
+pages = lazy_pool.acquire()
+pages.get_object('first').set_label('changed')
+pages.get_object('button').set_label('changed')
+lazy_pool.release(pages)
+assert pages.get_object('first').get_label() == 'First page'
+assert pages.get_object('button').get_label() == 'Press me'
@@ -0,0 +1,34 @@
+from gtkclassbuilder import from_filename
+from gi.repository import GLib, Gtk
+from os import path
+
+gladefile = path.join(path.dirname(__file__), '..',
+                      'examples', 'hello', 'hello.glade')
+classes = from_filename(gladefile)
+
+prebuild = classes.prebuild('MainWindow', count=2, budget=0.001)
+assert not prebuild.done
+context = GLib.MainContext.default()
+while not prebuild.done:
+    context.iteration(True)
+
+pool = classes['MainWindow'].pool()
+assert pool.stats()['added'] == 2
+w = pool.acquire()
+assert isinstance(w, Gtk.Window)
+assert w.get_object('MainWindow') is w
+assert w.get_object('box1').get_orientation() == Gtk.Orientation.VERTICAL
+
+# If building an instance fails, the prebuild stops.
+def fail():
+    raise RuntimeError('failed')
+    yield
+
+
+MainWindow = classes['MainWindow']
+MainWindow._construct_steps = staticmethod(fail)
+prebuild = classes.prebuild('MainWindow', count=1)
+while not prebuild.done:
+    context.iteration(True)
+del MainWindow._construct_steps
+assert pool.stats()['added'] == 2
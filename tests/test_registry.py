@@ -0,0 +1,40 @@
+from gtkclassbuilder import Registry, from_filename, from_string, registry
+from os import path
+
+input = """<interface>
+  <object class="GtkBox" id="Row%d">
+    <property name="visible">True</property>
+  </object>
+</interface>"""
+
+registry.clear()
+first = from_string(input % 0)
+# Whitespace around the document doesn't matter, but the options do.
+assert from_string('\n' + input % 0 + '\n') is first
+assert from_string(input % 0)['Row0'] is first['Row0']
+assert from_string(input % 0, construct_properties=True) is not first
+# ...other than the name of the source, which is only used for statistics.
+assert from_string(input % 0, source='row.glade') is first
+assert first.source is None
+
+gladefile = path.join(path.dirname(__file__), '..',
+                      'examples', 'hello', 'hello.glade')
+loaded = from_filename(gladefile)
+assert from_filename(gladefile, source='hello') is loaded
+
+# The registry is bounded; the least recently used builders are evicted.
+saved = registry.max_size
+try:
+    registry.resize(2)
+    stats = registry.stats()
+    assert stats['size'] == 2 and stats['max_size'] == 2
+    from_string(input % 1)
+    assert registry.stats()['evictions'] == stats['evictions'] + 1
+    assert from_string(input % 0) is not first
+finally:
+    registry.resize(saved)
+
+# A registry of size 0 keeps nothing.
+empty = Registry(max_size=0)
+assert empty.get(input, {}, dict) is not empty.get(input, {}, dict)
+assert len(empty) == 0
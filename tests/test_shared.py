@@ -0,0 +1,56 @@
+from gtkclassbuilder import from_string
+
+input = """<interface>
+  <object class="GtkTextBuffer" id="notice">
+    <property name="text">Read only</property>
+  </object>
+  <object class="GtkTextView" id="NoticeView">
+    <property name="buffer">notice</property>
+  </object>
+  <object class="GtkWindow" id="Unrelated"/>
+</interface>"""
+
+# By default, every instance gets a buffer of its own.
+NoticeView = from_string(input)['NoticeView']
+assert NoticeView().get_buffer() is not NoticeView().get_buffer()
+
+# Shared objects are built once per builder.
+classes = from_string(input, shared=['notice'])
+NoticeView = classes['NoticeView']
+views = NoticeView.instantiate_many(3)
+buffers = set(view.get_buffer() for view in views)
+assert len(buffers) == 1
+assert views[0].get_object('notice') is views[0].get_buffer()
+assert isinstance(views[0].get_buffer(), classes['notice'])
+
+# Finding out whether an object is shared doesn't generate other classes.
+assert not dict.__contains__(classes, 'Unrelated')
+
+# Releasing an instance leaves the shared object alone.
+pool = NoticeView.pool()
+pool.release(views[0])
+assert views[1].get_buffer().props.text == 'Read only'
+
+# Objects which are children of other objects are never shared, even when
+# they are also referred to.
+form = """<interface>
+  <object class="GtkBox" id="Form">
+    <child>
+      <object class="GtkLabel" id="label">
+        <property name="label">_Name</property>
+        <property name="use-underline">True</property>
+        <property name="mnemonic-widget">entry</property>
+      </object>
+    </child>
+    <child>
+      <object class="GtkEntry" id="entry"/>
+    </child>
+  </object>
+</interface>"""
+
+forms = from_string(form, shared=['entry'])['Form'].instantiate_many(2)
+assert forms[0].get_object('entry') is not forms[1].get_object('entry')
+for f in forms:
+    assert f.get_object('entry').get_parent() is f
+    assert f.get_object('label').get_mnemonic_widget() is \
+        f.get_object('entry')
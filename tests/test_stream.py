@@ -0,0 +1,54 @@
+import gtkclassbuilder
+from gtkclassbuilder._check import BadInput
+from os import path
+import io
+import xml.etree.ElementTree as ET
+
+gladefile = path.join(path.dirname(__file__), '..',
+                      'examples', 'hello', 'hello.glade')
+
+
+def describe(builder):
+    result = []
+    for ident, cls in builder.items():
+        result.append((ident, cls.__bases__[0], cls._signals, cls._children,
+                       [(p.key, p.value, p.reference)
+                        for p in cls._properties + cls._child_properties]))
+    return result
+
+
+# The streaming loader produces the same classes as the tree path.
+with open(gladefile) as f:
+    tree = gtkclassbuilder._from_tree(ET.fromstring(f.read()))
+stream = gtkclassbuilder._from_stream(gladefile)
+assert describe(tree) == describe(stream)
+
+# ...and raises the same errors.
+bad = [
+    '<interface/>',
+    '<interface><object class="Foo" id="a"/></interface>',
+    '<interface><object class="GtkBox" id="a"><child><packing/></child>'
+    '</object></interface>',
+]
+for text in bad:
+    errors = []
+    for load in (lambda text: gtkclassbuilder._from_tree(ET.fromstring(text)),
+                 lambda text: gtkclassbuilder._from_stream(
+                     io.BytesIO(text.encode('utf-8')))):
+        try:
+            load(text)
+        except BadInput as e:
+            errors.append([message for line, message in e.errors])
+    assert len(errors) == 2 and errors[0] == errors[1], errors
+
+# Documents given as text are not decoded again according to the encoding
+# they declare.
+latin1 = """<?xml version="1.0" encoding="ISO-8859-1"?>
+<interface>
+  <object class="GtkLabel" id="label">
+    <property name="label">café</property>
+  </object>
+</interface>"""
+for document in latin1, latin1.encode('iso-8859-1'):
+    label = gtkclassbuilder._from_string(document)['label']
+    assert label._properties[0].value == 'café', label._properties[0].value
@@ -0,0 +1,73 @@
+from gtkclassbuilder import from_string
+from gi.repository import GLib, Gtk
+
+input = """<interface>
+  <object class="GtkWindow" id="Dialog">
+    <property name="title">Template</property>
+    <child>
+      <object class="GtkBox" id="box">
+        <property name="visible">True</property>
+        <child>
+          <object class="GtkLabel" id="label">
+            <property name="visible">True</property>
+            <property name="label">Hello</property>
+            <property name="xalign">0</property>
+          </object>
+          <packing>
+            <property name="expand">True</property>
+          </packing>
+        </child>
+        <child>
+          <object class="GtkButton" id="button">
+            <property name="label">Click</property>
+            <signal name="clicked" handler="on_click" swapped="no"/>
+          </object>
+        </child>
+      </object>
+    </child>
+  </object>
+  <object class="GtkTextView" id="Editor">
+    <property name="buffer">buffer</property>
+  </object>
+  <object class="GtkTextBuffer" id="buffer">
+    <property name="text">Hello</property>
+  </object>
+</interface>"""
+
+builder = from_string(input, backend='template')
+Dialog = builder['Dialog']
+
+# The template is installed as soon as the class is generated.
+assert Dialog.__dict__['_compiled_plan'].template
+
+for w in Dialog(), Dialog.instantiate_many(1)[0]:
+    assert Dialog._get_plan().template
+    assert w.get_title() == 'Template'
+    label = w.get_object('label')
+    assert isinstance(label, Gtk.Label)
+    assert label.get_label() == 'Hello'
+    assert label.get_xalign() == 0
+    assert w.get_object('box').child_get_property(label, 'expand')
+    assert label.get_parent() is w.get_object('box')
+
+    clicks = []
+    w.connect_signals({'on_click': clicks.append})
+    w.get_object('button').clicked()
+    assert clicks == [w.get_object('button')]
+
+# Prebuilt instances are built from the template too, so their objects are
+# instances of the Gtk classes, rather than of the generated ones.
+prebuild = builder.prebuild('Dialog')
+context = GLib.MainContext.default()
+while not prebuild.done:
+    context.iteration(True)
+w = Dialog.pool().acquire()
+assert type(w.get_object('label')) is Gtk.Label
+assert w.get_object('label').get_label() == 'Hello'
+
+# References to other objects can't be expressed in a template, so the
+# python backend is used instead.
+Editor = builder['Editor']
+editor = Editor()
+assert not Editor._get_plan().template
+assert editor.get_buffer().props.text == 'Hello'
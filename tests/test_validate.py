@@ -0,0 +1,79 @@
+import gtkclassbuilder
+from gtkclassbuilder import _check
+from gtkclassbuilder._check import BadInput
+import logging
+
+# Every error in a document is reported at once, with its line number.
+bad = """<interface>
+  <object class="GtkWindow" id="window">
+    <property>no name</property>
+    <property name="title"></property>
+    <property name="visible">maybe</property>
+    <child>
+      <packing/>
+    </child>
+  </object>
+  <object class="Window" id="other"/>
+</interface>"""
+
+try:
+    gtkclassbuilder._from_string(bad)
+except BadInput as e:
+    assert e.errors == [
+        (3, "element 'property' is missing required elements: ['name']"),
+        (4, "Property with no text"),
+        (5, "Invalid value 'maybe' for property 'visible' of type "
+            "gboolean"),
+        (7, "First child of child element is not an object"),
+        (10, "Object has non Gtk class: 'Window'"),
+    ], e.errors
+    assert str(e).startswith('5 errors:\n  line 3: '), str(e)
+else:
+    assert False, 'Expected BadInput'
+assert not _check.validated(bad.encode('utf-8'))
+
+# Classes which don't exist are reported too.
+try:
+    gtkclassbuilder._from_string(
+        '<interface>\n'
+        '  <object class="GtkNoSuchWidget" id="a"/>\n'
+        '  <object class="Gtkwindow" id="b"/>\n'
+        '</interface>')
+except BadInput as e:
+    assert e.errors == [
+        (2, "Unknown class 'GtkNoSuchWidget'"),
+        (3, "Unknown class 'Gtkwindow'"),
+    ], e.errors
+else:
+    assert False, 'Expected BadInput'
+
+# Documents which have loaded without errors aren't validated again; here,
+# the unrecognized attribute is only warned about the first time.
+good = b"""<interface>
+  <object class="GtkWindow" id="window" colour="red">
+    <property name="title">Hello</property>
+  </object>
+</interface>"""
+
+
+class Handler(logging.Handler):
+    def __init__(self):
+        logging.Handler.__init__(self)
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+
+handler = Handler()
+_check.logger.addHandler(handler)
+try:
+    for i in range(2):
+        builder = gtkclassbuilder._from_string(good)
+        assert builder['window']().props.title == 'Hello'
+finally:
+    _check.logger.removeHandler(handler)
+assert handler.messages == [
+    "line 2: Unrecognized attribute 'colour' for 'object' element",
+], handler.messages
+assert _check.validated(good)